@@ -0,0 +1,128 @@
+import multiprocessing
+import queue
+from bitboard import Bitboard
+from engine import HalmaEngine
+from opening_book import book_key
+
+def think(requests, results, board_size, settings):
+    """
+    Worker loop: search each (request_id, red, green, color) request and post the
+    move back, or ("error", request_id, repr) if the search raised
+    """
+    engine = HalmaEngine(board_size, **settings)
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        request_id, red, green, color = request
+        results.put(("started", request_id, None))
+        try:
+            move = engine.get_ai_move(Bitboard(board_size, red, green), color)
+        except Exception as error:
+            results.put(("error", request_id, repr(error)))
+        else:
+            results.put(("done", request_id, move))
+    engine.close()
+
+class BackgroundSearch:
+    """
+    Runs HalmaEngine.get_ai_move in a separate process so the Tk event loop
+    never blocks on a search
+
+    Requests are answered in the order they were submitted and results are
+    kept per position, so positions searched ahead of time (pondering) are
+    answered instantly once they come up. Nothing here blocks: the caller
+    polls result() from a Tk after() callback. cancel() kills the worker,
+    dropping the search in progress and everything still queued
+
+    A search that raises, or a worker that dies, leaves its positions done
+    with error() set instead of result()
+    """
+    def __init__(self, board_size, settings):
+        self.board_size = board_size
+        # the worker is a daemon process, which may not start a pool of its own
+        self.settings = dict(settings, workers=1)
+        # spawn rather than fork so the worker doesn't inherit the Tk interpreter
+        self.context = multiprocessing.get_context("spawn")
+        self.process = None
+        self.requests = None
+        self.results = None
+        self.next_id = 0
+        self.pending = {}
+        self.running = None
+        self.finished = {}
+        self.failed = {}
+
+    def start(self):
+        self.requests = self.context.Queue()
+        self.results = self.context.Queue()
+        self.process = self.context.Process(target=think, args=(self.requests, self.results, self.board_size,
+                                                                 self.settings), daemon=True)
+        self.process.start()
+
+    def submit(self, position, color):
+        """Queue a search of position for color unless it is already done or queued"""
+        key = book_key(position, color)
+        if key in self.finished or key in self.failed or key in self.pending.values():
+            return
+        if self.process is None:
+            self.start()
+        self.next_id += 1
+        self.pending[self.next_id] = key
+        self.requests.put((self.next_id, position.red, position.green, color))
+
+    def poll(self):
+        if self.process is None:
+            return
+        while True:
+            try:
+                kind, request_id, move = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "started":
+                self.running = request_id
+            elif kind == "error":
+                self.failed[self.pending.pop(request_id)] = move
+                self.running = None
+            else:
+                self.finished[self.pending.pop(request_id)] = move
+                self.running = None
+        if not self.process.is_alive():
+            # everything it still owed is lost; the next submit() starts a new worker
+            for key in self.pending.values():
+                self.failed[key] = f"search worker exited with code {self.process.exitcode}"
+            self.process = None
+            self.pending = {}
+            self.running = None
+
+    def is_running(self, position, color):
+        """True when the worker has already started on position"""
+        self.poll()
+        return self.running is not None and self.pending.get(self.running) == book_key(position, color)
+
+    def is_done(self, position, color):
+        self.poll()
+        key = book_key(position, color)
+        return key in self.finished or key in self.failed
+
+    def result(self, position, color):
+        """The finished (from_cell, to_cell) move for position (None if color had no moves)"""
+        return self.finished.get(book_key(position, color))
+
+    def error(self, position, color):
+        """Why the search of position failed, or None"""
+        return self.failed.get(book_key(position, color))
+
+    def cancel(self):
+        """Stop all queued and running searches; finished results are kept"""
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join()
+            self.process = None
+        self.pending = {}
+        self.running = None
+
+    def close(self):
+        self.cancel()
+        self.finished = {}
+        self.failed = {}
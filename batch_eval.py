@@ -0,0 +1,78 @@
+import numpy as np
+from geometry import MOVE_DIRS
+
+# square states in the (N, size, size) int8 stacks this module works on
+EMPTY = 0
+RED = 1
+GREEN = 2
+STATES = {"empty": EMPTY, "red": RED, "green": GREEN}
+
+def encode(position):
+    """(size, size) int8 array for one Bitboard"""
+    size = position.board_size
+    cells = size * size
+    nbytes = (cells + 7) // 8
+    red = np.unpackbits(np.frombuffer(position.red.to_bytes(nbytes, "little"), np.uint8), bitorder="little")
+    green = np.unpackbits(np.frombuffer(position.green.to_bytes(nbytes, "little"), np.uint8), bitorder="little")
+    board = red[:cells].astype(np.int8) * RED + green[:cells].astype(np.int8) * GREEN
+    return board.reshape(size, size)
+
+def encode_dict(board, board_size):
+    """(size, size) int8 array for one {(row, col): state} board"""
+    array = np.zeros((board_size, board_size), np.int8)
+    for (row, col), state in board.items():
+        array[row, col] = STATES[state]
+    return array
+
+def stack(positions):
+    """(N, size, size) int8 stack of Bitboards"""
+    return np.stack([encode(position) for position in positions])
+
+class BatchEvaluator:
+    """
+    Vectorized HalmaEngine.utility_fn over a stack of positions
+
+    The goal distance and in-goal bonus terms match utility_fn exactly.
+    Mobility is approximated by counting single steps and single jumps per
+    piece, so pieces that could chain jumps further are undercounted
+    """
+    def __init__(self, board_size, piece_values):
+        self.board_size = board_size
+        self.red_values = np.array(piece_values["red"], np.int32).reshape(board_size, board_size)
+        self.green_values = np.array(piece_values["green"], np.int32).reshape(board_size, board_size)
+
+    def mobility(self, boards):
+        """(N, size, size) count of step and single-jump destinations from each square"""
+        size = self.board_size
+        empty = np.pad(boards == EMPTY, ((0, 0), (2, 2), (2, 2)))
+        occupied = np.pad(boards != EMPTY, ((0, 0), (2, 2), (2, 2)))
+        moves = np.zeros(boards.shape, np.int32)
+        for row_dir, col_dir in MOVE_DIRS:
+            step = empty[:, 2 + row_dir:2 + row_dir + size, 2 + col_dir:2 + col_dir + size]
+            over = occupied[:, 2 + row_dir:2 + row_dir + size, 2 + col_dir:2 + col_dir + size]
+            land = empty[:, 2 + 2 * row_dir:2 + 2 * row_dir + size, 2 + 2 * col_dir:2 + 2 * col_dir + size]
+            moves += step
+            moves += over & land
+        return moves
+
+    def evaluate(self, boards):
+        """(N,) utilities for an (N, size, size) int8 stack; (+) is better for red"""
+        red = boards == RED
+        green = boards == GREEN
+        mobility = self.mobility(boards)
+        red_total = np.where(red, self.red_values + mobility, 0).sum(axis=(1, 2))
+        green_total = np.where(green, self.green_values - mobility, 0).sum(axis=(1, 2))
+        return red_total + green_total
+
+    def children(self, position, moves, color):
+        """(N, size, size) stack of position after each (from_index, to_index) move"""
+        size = self.board_size
+        moves = np.array(moves, np.int32).reshape(-1, 2)
+        boards = np.repeat(encode(position)[np.newaxis], len(moves), axis=0)
+        rows = np.arange(len(moves))
+        boards[rows, moves[:, 0] // size, moves[:, 0] % size] = EMPTY
+        boards[rows, moves[:, 1] // size, moves[:, 1] % size] = STATES[color]
+        return boards
+
+    def evaluate_children(self, position, moves, color):
+        return self.evaluate(self.children(position, moves, color))
@@ -0,0 +1,213 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from bitboard import Bitboard
+from engine import HalmaEngine, MoveGenerator
+from geometry import get_geometry, get_goal_camps, get_goal_distances, iter_bits
+from movecache import MoveCache
+
+BOARD_SIZES = (8, 10, 16)
+CORPUS_SEED = 1234
+# (board_size, depth) pairs timed by the search benchmarks; unpruned search is exponential so keep these small
+SEARCH_DEPTHS = {8: 3, 10: 2, 16: 2}
+
+def opening_position(board_size):
+    return HalmaEngine(board_size).position()
+
+def midgame_position(board_size, plies, rng):
+    """Both sides advance toward each other with mostly forward moves until the middle jams up"""
+    game = HalmaEngine(board_size)
+    distances = get_goal_distances(board_size)
+    geometry = get_geometry(board_size)
+    for ply in range(plies):
+        color = game.turn
+        moves = game.legal_moves()
+        index = geometry.index
+        moves.sort(key=lambda move: distances[color][index(move[1])] - distances[color][index(move[0])])
+        game.play_move(*rng.choice(moves[:max(1, len(moves) // 4)]))
+    return game.position()
+
+def endgame_position(board_size, stragglers, rng):
+    """Each side has filled all but a few squares of its goal camp and has that many pieces still outside"""
+    geometry = get_geometry(board_size)
+    red_goals, green_goals = get_goal_camps(board_size)
+    distances = get_goal_distances(board_size)
+    red = geometry.mask_of(green_goals[stragglers:])
+    green = geometry.mask_of(red_goals[stragglers:])
+    for color in ("red", "green"):
+        candidates = [index for index, cell in enumerate(geometry.cells)
+                      if 2 <= distances[color][index] <= 4 and not (red | green) >> index & 1]
+        for index in rng.sample(candidates, stragglers):
+            if color == "red":
+                red |= 1 << index
+            else:
+                green |= 1 << index
+    return Bitboard(board_size, red, green)
+
+def build_corpus():
+    """Fixed, seeded list of (name, position, side_to_move)"""
+    rng = random.Random(CORPUS_SEED)
+    corpus = []
+    for board_size in BOARD_SIZES:
+        corpus.append((f"{board_size}x{board_size}/opening", opening_position(board_size), "red"))
+        corpus.append((f"{board_size}x{board_size}/midgame", midgame_position(board_size, board_size * 3, rng), "red"))
+        corpus.append((f"{board_size}x{board_size}/endgame", endgame_position(board_size, 3, rng), "red"))
+    return corpus
+
+def timed(fn, min_time):
+    """Call fn until min_time has passed; return (calls, seconds)"""
+    calls = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time or not calls:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+    return calls, elapsed
+
+def bench_movegen(position, min_time):
+    pieces = list(iter_bits(position.occupied))
+    count = sum(position.count_moves(index) for index in pieces)
+    calls, elapsed = timed(lambda: [position.get_move_mask(index) for index in pieces], min_time)
+    results = {"movegen_bitboard_moves_per_sec": (calls * count / elapsed, True)}
+
+    cached = position.copy()
+    cached.move_cache = MoveCache()
+    calls, elapsed = timed(lambda: [cached.get_move_mask(index) for index in pieces], min_time)
+    results["movegen_cached_moves_per_sec"] = (calls * count / elapsed, True)
+
+    board = position.to_dict()
+    cells = [position.geometry.cells[index] for index in pieces]
+    board_size = position.board_size
+    calls, elapsed = timed(lambda: [MoveGenerator.get_reachable(cell, board, board_size) for cell in cells], min_time)
+    results["movegen_dict_moves_per_sec"] = (calls * count / elapsed, True)
+    return results
+
+def bench_eval(position, min_time):
+    engine = HalmaEngine(position.board_size)
+    calls, elapsed = timed(lambda: engine.utility_fn(position), min_time)
+    return {"evals_per_sec": (calls / elapsed, True)}
+
+def bench_batch_eval(position, color, min_time):
+    """Score every child of position in one batch_eval.py call, against utility_fn one child at a time"""
+    try:
+        from batch_eval import BatchEvaluator
+    except ImportError:
+        # numpy not installed
+        return {}
+    engine = HalmaEngine(position.board_size)
+    evaluator = BatchEvaluator(position.board_size, engine.piece_values)
+    moves = list(position.generate_moves(color))
+    # includes building the child stack, as search does for every depth-1 node
+    calls, elapsed = timed(lambda: evaluator.evaluate_children(position, moves, color), min_time)
+    results = {"batch_evals_per_sec": (calls * len(moves) / elapsed, True)}
+
+    children = []
+    for move in moves:
+        child = position.copy()
+        child.make_move(*move)
+        children.append(child)
+    calls, elapsed = timed(lambda: [engine.utility_fn(child) for child in children], min_time)
+    results["scalar_child_evals_per_sec"] = (calls * len(moves) / elapsed, True)
+    return results
+
+def bench_search(position, color, min_time):
+    results = {}
+    depth = SEARCH_DEPTHS[position.board_size]
+    for pruning in (False, True):
+        engine = HalmaEngine(position.board_size, ai_search_depth=depth, pruning=pruning, tt_size=0)
+        start = time.perf_counter()
+        engine.get_ai_move(position.copy(), color)
+        elapsed = time.perf_counter() - start
+        label = "pruned" if pruning else "unpruned"
+        results[f"search_d{depth}_{label}_seconds"] = (elapsed, False)
+        results[f"search_d{depth}_{label}_nodes"] = (engine.nodes, False)
+    return results
+
+def bench_pvs(position, color, min_time):
+    """Nodes alpha-beta and principal variation search need for the same search, one ply deeper than bench_search"""
+    depth = SEARCH_DEPTHS[position.board_size] + 1
+    results = {}
+    moves = {}
+    for label, settings in (("alphabeta", {"pruning": True}), ("pvs", {"pvs": True})):
+        engine = HalmaEngine(position.board_size, ai_search_depth=depth, **settings)
+        start = time.perf_counter()
+        moves[label] = engine.get_ai_move(position.copy(), color)
+        elapsed = time.perf_counter() - start
+        results[f"search_d{depth}_{label}_nodes"] = (engine.nodes, False)
+        results[f"search_d{depth}_{label}_seconds"] = (elapsed, False)
+    results[f"search_d{depth}_pvs_node_ratio"] = (results[f"search_d{depth}_pvs_nodes"][0] /
+                                                  results[f"search_d{depth}_alphabeta_nodes"][0], False)
+    results[f"search_d{depth}_pvs_same_move"] = (float(moves["pvs"] == moves["alphabeta"]), True)
+    return results
+
+BENCHMARKS = {
+    "movegen": lambda name, position, color, min_time: bench_movegen(position, min_time),
+    "eval": lambda name, position, color, min_time: bench_eval(position, min_time),
+    "batch_eval": lambda name, position, color, min_time: bench_batch_eval(position, color, min_time),
+    "search": lambda name, position, color, min_time: bench_search(position, color, min_time),
+    "pvs": lambda name, position, color, min_time: bench_pvs(position, color, min_time),
+}
+
+def run_benchmarks(selected = None, min_time = 0.5, positions = None):
+    metrics = {}
+    for name, position, color in build_corpus():
+        if positions and not any(pattern in name for pattern in positions):
+            continue
+        for bench_name, bench_fn in BENCHMARKS.items():
+            if selected and bench_name not in selected:
+                continue
+            for metric, (value, higher_is_better) in bench_fn(name, position, color, min_time).items():
+                metrics[f"{name}/{metric}"] = {"value": value, "higher_is_better": higher_is_better}
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "metrics": metrics,
+    }
+
+def compare(results, baseline, threshold):
+    """List of (metric, baseline value, new value, relative change) that got worse by more than threshold"""
+    regressions = []
+    for metric, entry in results["metrics"].items():
+        old = baseline["metrics"].get(metric)
+        if old is None or not old["value"]:
+            continue
+        change = (entry["value"] - old["value"]) / old["value"]
+        if entry["higher_is_better"] and change < -threshold or not entry["higher_is_better"] and change > threshold:
+            regressions.append((metric, old["value"], entry["value"], change))
+    return regressions
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Benchmark move generation, evaluation and search on a fixed corpus")
+    parser.add_argument("--only", nargs="*", choices=sorted(BENCHMARKS), help="run just these benchmarks")
+    parser.add_argument("--positions", nargs="*", help="only corpus positions whose name contains one of these")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds to spend on each throughput measurement")
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--compare", help="baseline results JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative slowdown that counts as a regression")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.only, args.min_time, args.positions)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for metric, old, new, change in regressions:
+            print(f"REGRESSION {metric}: {old:.4g} -> {new:.4g} ({change:+.1%})", file=sys.stderr)
+        if regressions:
+            return 1
+        print("no regressions", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
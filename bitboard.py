@@ -0,0 +1,166 @@
+from geometry import get_geometry, iter_bits
+from transposition import get_zobrist_keys
+
+class Bitboard:
+    """
+    Compact position: one integer bitmask per color
+
+    Bit i is set in self.red / self.green when square i (row-major) holds
+    a piece of that color. Convert with from_dict / to_dict to talk to code
+    that still uses the {(row, col): 'red' | 'green' | 'empty'} board
+
+    self.hash is the Zobrist key of the pieces and is kept up to date by
+    make_move / unmake_move
+    """
+    def __init__(self, board_size, red = 0, green = 0):
+        self.board_size = board_size
+        self.geometry = get_geometry(board_size)
+        self.zobrist = get_zobrist_keys(board_size)
+        self.red = red
+        self.green = green
+        self.hash = self.zobrist.hash_masks(red, green)
+        self.history = []
+        # optional movecache.MoveCache consulted by get_move_mask
+        self.move_cache = None
+
+    @classmethod
+    def from_dict(cls, board, board_size):
+        geometry = get_geometry(board_size)
+        red = 0
+        green = 0
+        for cell, state in board.items():
+            if state == "red":
+                red |= 1 << geometry.index(cell)
+            elif state == "green":
+                green |= 1 << geometry.index(cell)
+        return cls(board_size, red, green)
+
+    def to_dict(self):
+        board = {}
+        for index, cell in enumerate(self.geometry.cells):
+            board[cell] = self.state_at(index)
+        return board
+
+    @classmethod
+    def from_bytes(cls, data):
+        board_size = data[0]
+        mask_size = cls.mask_bytes(board_size)
+        red = int.from_bytes(data[1:1 + mask_size], "little")
+        green = int.from_bytes(data[1 + mask_size:1 + 2 * mask_size], "little")
+        return cls(board_size, red, green)
+
+    @staticmethod
+    def mask_bytes(board_size):
+        return (board_size * board_size + 7) // 8
+
+    def to_bytes(self):
+        """Board size byte followed by the red and green masks, little endian, padded to whole bytes"""
+        mask_size = self.mask_bytes(self.board_size)
+        return bytes([self.board_size]) + self.red.to_bytes(mask_size, "little") + \
+            self.green.to_bytes(mask_size, "little")
+
+    def copy(self):
+        return Bitboard(self.board_size, self.red, self.green)
+
+    @property
+    def occupied(self):
+        return self.red | self.green
+
+    def pieces(self, color):
+        return self.red if color == "red" else self.green
+
+    def state_at(self, index):
+        bit = 1 << index
+        if self.red & bit:
+            return "red"
+        if self.green & bit:
+            return "green"
+        return "empty"
+
+    def get_move_mask(self, index):
+        """
+        Bitmask of every square the piece on index can reach this turn:
+        single steps from the origin plus all squares reachable by a chain of jumps
+        """
+        if self.move_cache is not None:
+            return self.move_cache.get(self, index)
+        geometry = self.geometry
+        occupied = self.red | self.green
+        origin_bit = 1 << index
+        jumpable = occupied & ~origin_bit
+        dest_mask = geometry.neighbor_masks[index] & ~occupied
+        visited = 0
+        frontier = [index]
+        while frontier:
+            curr = frontier.pop()
+            for over_bit, land_bit, land_index in geometry.jumps[curr]:
+                if jumpable & over_bit and not (occupied | visited) & land_bit:
+                    visited |= land_bit
+                    frontier.append(land_index)
+        return dest_mask | visited
+
+    def get_move_mask_with_reach(self, index):
+        """
+        Like get_move_mask, but also returns the mask of every square whose
+        occupancy the result depends on (including index itself). The move
+        mask stays valid as long as none of those squares change
+        """
+        geometry = self.geometry
+        occupied = self.red | self.green
+        origin_bit = 1 << index
+        jumpable = occupied & ~origin_bit
+        dest_mask = geometry.neighbor_masks[index] & ~occupied
+        reach = origin_bit
+        visited = 0
+        frontier = [index]
+        while frontier:
+            curr = frontier.pop()
+            # a jump only looks at its landing square when there is a piece to jump over
+            reach |= geometry.neighbor_masks[curr]
+            for over_bit, land_bit, land_index in geometry.jumps[curr]:
+                if jumpable & over_bit:
+                    reach |= land_bit
+                    if not (occupied | visited) & land_bit:
+                        visited |= land_bit
+                        frontier.append(land_index)
+        return dest_mask | visited, reach
+
+    def get_moves(self, cell):
+        index = self.geometry.index(cell)
+        cells = self.geometry.cells
+        return [cells[dest] for dest in iter_bits(self.get_move_mask(index))]
+
+    def count_moves(self, index):
+        return self.get_move_mask(index).bit_count()
+
+    def generate_moves(self, color):
+        """Yield (from_index, to_index) for every legal move of color"""
+        for index in iter_bits(self.pieces(color)):
+            for dest in iter_bits(self.get_move_mask(index)):
+                yield index, dest
+
+    def make_move(self, from_index, to_index):
+        """Move the piece on from_index to to_index in place and remember how to undo it"""
+        move_mask = (1 << from_index) | (1 << to_index)
+        if self.red >> from_index & 1:
+            self.red ^= move_mask
+            self.hash ^= self.zobrist.red[from_index] ^ self.zobrist.red[to_index]
+        else:
+            self.green ^= move_mask
+            self.hash ^= self.zobrist.green[from_index] ^ self.zobrist.green[to_index]
+        self.history.append((from_index, to_index))
+
+    def unmake_move(self):
+        from_index, to_index = self.history.pop()
+        move_mask = (1 << from_index) | (1 << to_index)
+        if self.red >> to_index & 1:
+            self.red ^= move_mask
+            self.hash ^= self.zobrist.red[from_index] ^ self.zobrist.red[to_index]
+        else:
+            self.green ^= move_mask
+            self.hash ^= self.zobrist.green[from_index] ^ self.zobrist.green[to_index]
+        return from_index, to_index
+
+    def __eq__(self, other):
+        return isinstance(other, Bitboard) and self.board_size == other.board_size and \
+            self.red == other.red and self.green == other.green
@@ -0,0 +1,305 @@
+import argparse
+import heapq
+import json
+import os
+import random
+import sys
+import time
+from bitboard import Bitboard
+from geometry import get_geometry, get_goal_camps, iter_bits
+from opening_book import SIDE_TO_MOVE, book_key
+from record_file import RecordFile, write_records
+
+ENDGAME_MAGIC = b"HLME"
+# distance stored for positions the solver gave up on (no finish within max_moves / max_nodes)
+UNSOLVED = 255
+# floor tables kept at once; each depends on where the pieces that can be hopped over are
+FLOOR_CACHE_SIZE = 64
+
+class EndgameSolver:
+    """
+    Exact number of moves a side needs to fill its goal camp, for positions
+    with only a few of its pieces still outside
+
+    The opponent's pieces stay where they are and pieces already in the camp
+    only move within it; the stragglers move one move per turn, using every
+    jump chain the move generator allows. Solved distances are kept in memory and, when
+    table_path is given, in a record file that is only opened on first lookup
+    and rewritten by save()
+
+    The search is A* on the sum of each straggler's floor, the fewest moves it
+    could need on its own (see floors). A solve gives up after max_nodes
+    expansions or at its deadline; best_move then leaves that color alone
+    until its position has clearly improved
+    """
+    def __init__(self, board_size, table_path = None, max_moves = 16, max_nodes = 50000):
+        self.board_size = board_size
+        self.geometry = get_geometry(board_size)
+        red_goals, green_goals = get_goal_camps(board_size)
+        # the camp each color is trying to fill
+        self.targets = {"red": self.geometry.mask_of(green_goals), "green": self.geometry.mask_of(red_goals)}
+        self.table_path = table_path
+        self.records = None
+        self.solved = {}
+        self.max_moves = max_moves
+        self.max_nodes = max_nodes
+        self.scratch = Bitboard(board_size)
+        self.floor_cache = {}
+        # color -> (camp squares left, estimate) when its last solve gave up
+        self.gave_up = {}
+
+    def key(self, own, other, color):
+        if color == "red":
+            position = Bitboard(self.board_size, own, other)
+        else:
+            position = Bitboard(self.board_size, other, own)
+        return book_key(position, color)
+
+    def lookup(self, key):
+        distance = self.solved.get(key)
+        if distance is not None:
+            return distance
+        if self.records is None and self.table_path and os.path.exists(self.table_path):
+            self.records = RecordFile(self.table_path, ENDGAME_MAGIC)
+        if self.records is not None:
+            value = self.records.get(key)
+            if value is not None:
+                return value[0]
+        return None
+
+    def to_win(self, position, color):
+        target = self.targets[color]
+        return (target & ~position.pieces(color)).bit_count()
+
+    def floors(self, target, stones, blocked):
+        """
+        Fewest moves a lone piece needs from each square to reach target when it may
+        hop over any square in stones and land on any square not in blocked.
+        Squares that can't get there at all read max_moves + 1
+        """
+        key = (target, stones, blocked)
+        floors = self.floor_cache.get(key)
+        if floors is not None:
+            return floors
+        geometry = self.geometry
+        open_squares = geometry.full_mask & ~blocked
+        # squares linked by hops; one move gets from any of them to any other
+        hop_groups = [0] * geometry.num_cells
+        for index in iter_bits(open_squares):
+            if hop_groups[index]:
+                continue
+            group = 1 << index
+            frontier = [index]
+            while frontier:
+                curr = frontier.pop()
+                for over_bit, land_bit, land_index in geometry.jumps[curr]:
+                    if stones & over_bit and open_squares & land_bit and not group & land_bit:
+                        group |= land_bit
+                        frontier.append(land_index)
+            for member in iter_bits(group):
+                hop_groups[member] = group
+
+        floors = [self.max_moves + 1] * geometry.num_cells
+        reached = frontier = target & open_squares
+        moves = 0
+        while frontier:
+            next_frontier = 0
+            for index in iter_bits(frontier):
+                floors[index] = moves
+                next_frontier |= geometry.neighbor_masks[index] | hop_groups[index]
+            frontier = next_frontier & open_squares & ~reached
+            reached |= frontier
+            moves += 1
+        if len(self.floor_cache) >= FLOOR_CACHE_SIZE:
+            self.floor_cache.clear()
+        self.floor_cache[key] = floors
+        return floors
+
+    def lower_bounds(self, own, other, target):
+        """
+        Admissible per-square floors for the stragglers of own: only the opponent and
+        the camp are sure to stay put, and with more than one straggler out any
+        square may end up holding a piece to hop over
+        """
+        stragglers = own & ~target
+        if stragglers & (stragglers - 1):
+            stones = self.geometry.full_mask
+        else:
+            stones = other | target
+        return self.floors(target, stones, other)
+
+    def estimate(self, own, other, target):
+        """Rough moves to finish, hopping only over pieces where they stand now"""
+        floors = self.floors(target, own | other, other)
+        return sum(floors[index] for index in iter_bits(own & ~target))
+
+    def worth_solving(self, own, other, color):
+        """
+        False when a solve is unlikely to finish in budget: the estimate is past
+        max_moves, or the last solve for color gave up and neither a camp square has
+        been filled nor the estimate halved since
+        """
+        target = self.targets[color]
+        estimate = self.estimate(own, other, target)
+        if estimate > self.max_moves:
+            return False
+        failure = self.gave_up.get(color)
+        if failure is not None:
+            to_win, failed_estimate = failure
+            if (target & ~own).bit_count() >= to_win and estimate > failed_estimate // 2:
+                return False
+        return True
+
+    def straggler_moves(self, own, other, target):
+        scratch = self.scratch
+        scratch.red = own
+        scratch.green = other
+        for from_index in iter_bits(own):
+            moves = scratch.get_move_mask(from_index)
+            if target >> from_index & 1:
+                # pieces already home only shuffle deeper to make room, never leave
+                moves &= target
+            for to_index in iter_bits(moves):
+                yield from_index, to_index
+
+    def solve(self, position, color, deadline = None):
+        """
+        Shortest list of (from_index, to_index) moves that fills color's camp, or None.
+        Positions proved unsolvable or given up on after max_nodes are remembered as
+        UNSOLVED; running past deadline (a time.perf_counter() value) is not, since
+        another try with more time may succeed
+        """
+        own = position.pieces(color)
+        other = position.pieces("green" if color == "red" else "red")
+        target = self.targets[color]
+        if other & target:
+            # the opponent is sitting in the camp; this solver never moves them out
+            return None
+
+        floors = self.lower_bounds(own, other, target)
+        estimate = sum(floors[index] for index in iter_bits(own))
+        best = {own: 0}
+        parents = {own: None}
+        # ties go to the deeper node, which is usually closer to done
+        frontier = [(estimate, 0, estimate, own)]
+        expanded = 0
+        while frontier:
+            _, moves, estimate, mask = heapq.heappop(frontier)
+            moves = -moves
+            if moves > best[mask]:
+                continue
+            if mask & target == target:
+                path = []
+                while parents[mask] is not None:
+                    mask, move = parents[mask]
+                    path.append(move)
+                path.reverse()
+                self.remember(own, other, color, path)
+                return path
+            expanded += 1
+            if expanded > self.max_nodes:
+                break
+            if deadline is not None and not expanded & 63 and time.perf_counter() > deadline:
+                return None
+            for from_index, to_index in self.straggler_moves(mask, other, target):
+                child_estimate = estimate - floors[from_index] + floors[to_index]
+                if moves + 1 + child_estimate > self.max_moves:
+                    continue
+                child = mask ^ (1 << from_index) ^ (1 << to_index)
+                if best.get(child, self.max_moves + 1) <= moves + 1:
+                    continue
+                best[child] = moves + 1
+                parents[child] = (mask, (from_index, to_index))
+                heapq.heappush(frontier, (moves + 1 + child_estimate, -moves - 1, child_estimate, child))
+        self.solved[self.key(own, other, color)] = UNSOLVED
+        return None
+
+    def remember(self, own, other, color, path):
+        """Every position along an optimal path is itself solved"""
+        for distance in range(len(path), -1, -1):
+            self.solved[self.key(own, other, color)] = distance
+            if distance:
+                from_index, to_index = path[len(path) - distance]
+                own ^= (1 << from_index) | (1 << to_index)
+
+    def moves_to_finish(self, position, color):
+        own = position.pieces(color)
+        other = position.pieces("green" if color == "red" else "red")
+        distance = self.lookup(self.key(own, other, color))
+        if distance is None:
+            path = self.solve(position, color)
+            distance = len(path) if path is not None else UNSOLVED
+        return None if distance == UNSOLVED else distance
+
+    def best_move(self, position, color, deadline = None):
+        """
+        First move of a shortest way to fill the camp, or None when the position
+        isn't known and a solve before deadline looks unlikely or fails
+        """
+        own = position.pieces(color)
+        other = position.pieces("green" if color == "red" else "red")
+        target = self.targets[color]
+        distance = self.lookup(self.key(own, other, color))
+        if distance == UNSOLVED:
+            return None
+        if distance is not None:
+            for from_index, to_index in self.straggler_moves(own, other, target):
+                child = own ^ (1 << from_index) ^ (1 << to_index)
+                if self.lookup(self.key(child, other, color)) == distance - 1:
+                    return from_index, to_index
+        if not self.worth_solving(own, other, color):
+            return None
+        path = self.solve(position, color, deadline)
+        if path is None:
+            self.gave_up[color] = (self.to_win(position, color), self.estimate(own, other, target))
+            return None
+        self.gave_up.pop(color, None)
+        return path[0] if path else None
+
+    def save(self, path = None):
+        """Write everything known (file contents plus new solves) back to disk"""
+        path = path or self.table_path
+        records = {}
+        if self.records is not None:
+            for record in range(len(self.records)):
+                key = self.records.key_at(record)
+                records[key] = self.records.get(key)
+            self.records.close()
+            self.records = None
+        for key, distance in self.solved.items():
+            records[key] = bytes([distance])
+        key_size = 1 + 2 * Bitboard.mask_bytes(self.board_size) + len(SIDE_TO_MOVE["red"])
+        write_records(path, ENDGAME_MAGIC, records, key_size, 1)
+        self.table_path = path
+        return len(records)
+
+def build_table(path, board_size, positions, stragglers, seed = 0):
+    """Solve random endgames with the given number of stragglers per side and store them"""
+    rng = random.Random(seed)
+    geometry = get_geometry(board_size)
+    red_goals, green_goals = get_goal_camps(board_size)
+    solver = EndgameSolver(board_size, path)
+    for _ in range(positions):
+        for color, camp, other_camp in (("red", green_goals, red_goals), ("green", red_goals, green_goals)):
+            own = geometry.mask_of(rng.sample(camp, len(camp) - stragglers))
+            other = geometry.mask_of(other_camp)
+            free = [index for index in range(geometry.num_cells) if not (own | other | geometry.mask_of(camp)) >> index & 1]
+            for index in rng.sample(free, stragglers):
+                own |= 1 << index
+            position = Bitboard(board_size, own, other) if color == "red" else Bitboard(board_size, other, own)
+            solver.moves_to_finish(position, color)
+    return solver.save(path)
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Precompute endgame distances for camp filling")
+    parser.add_argument("output")
+    parser.add_argument("--board-size", type=int, default=8)
+    parser.add_argument("--positions", type=int, default=100)
+    parser.add_argument("--stragglers", type=int, default=2, help="pieces outside the camp in each sampled position")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    count = build_table(args.output, args.board_size, args.positions, args.stragglers, args.seed)
+    print(json.dumps({"output": args.output, "positions": count}), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,841 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from bitboard import Bitboard
+from endgame import EndgameSolver
+from evaluation import IncrementalEvaluator
+from geometry import get_geometry, get_goal_camps, get_goal_distances, iter_bits
+from move_ordering import MoveOrderer
+from movecache import MoveCache
+from opening_book import open_book
+from search_stats import SearchStats
+from transposition import EXACT, LOWER, UPPER, TranspositionTable
+
+# least time the endgame solver gets per move, for when no search has been timed yet
+MIN_ENDGAME_SECONDS = 0.02
+
+class MinMaxNode:
+    def __init__(self, board, utility, parent = None):
+        self.board = board
+        self.utility = utility
+        self.parent = parent
+        self.alpha= float("-inf")
+        self.beta = float("inf")
+
+class SearchTimeout(Exception):
+    pass
+
+# engines kept alive inside pool worker processes, one per (board_size, settings)
+_worker_engines = {}
+
+def worker_engine(board_size, settings):
+    """This worker process's HalmaEngine for board_size and settings, built on first use"""
+    key = (board_size, tuple(sorted(settings.items())))
+    engine = _worker_engines.get(key)
+    if engine is None:
+        engine = _worker_engines[key] = HalmaEngine(board_size, **settings)
+    return engine
+
+def search_move_in_worker(board_size, settings, red, green, move, depth_left, maximizing, alpha, beta):
+    """Run in a worker process: search one root move of the position given by the red / green masks"""
+    engine = worker_engine(board_size, settings)
+    position = Bitboard(board_size, red, green)
+    engine.new_search(position)
+    engine.root_depth = depth_left
+    engine.apply_move(position, move)
+    utility = engine.search(position, depth_left - 1, alpha, beta, not maximizing)
+    return utility, engine.nodes
+
+class HalmaEngine:
+    """
+    Game rules, scoring and AI search with no tkinter dependency
+
+    Holds one game: self.board in the {(row, col): 'red' | 'green' | 'empty'}
+    form, whose turn it is, and red_score / green_score / *_to_win. The Tk
+    GameManager in halma.py is a thin client over this class
+    """
+    def __init__(self, board_size, ai_search_depth = 0, pruning = False, debug = False, tt_size = 1 << 16,
+                 time_limit = None, move_ordering = True, incremental_eval = True, distance_metric = "manhattan",
+                 workers = 1, collect_stats = False, stats_log = None, opening_book = None, endgame_threshold = 0,
+                 endgame_table = None, batch_eval = False, pvs = False, aspiration_window = 0, move_cache = 0):
+        self.board = {}
+        self.board_size = board_size
+        # constructor options, so a finished game can be restarted with the same setup
+        self.settings = {
+            "ai_search_depth": ai_search_depth, "pruning": pruning, "debug": debug, "tt_size": tt_size,
+            "time_limit": time_limit, "move_ordering": move_ordering, "incremental_eval": incremental_eval,
+            "distance_metric": distance_metric, "workers": workers, "collect_stats": collect_stats,
+            "stats_log": stats_log, "opening_book": opening_book, "endgame_threshold": endgame_threshold,
+            "endgame_table": endgame_table, "batch_eval": batch_eval, "pvs": pvs,
+            "aspiration_window": aspiration_window, "move_cache": move_cache,
+        }
+        self.ai_search_depth = ai_search_depth
+        self.debug = debug
+        self.pruning = pruning
+        # negamax principal variation search instead of search (always prunes); with time_limit,
+        # each iteration after the first starts from a window of +-aspiration_window around the
+        # previous score, widening to the full window if the result falls outside it
+        self.pvs = pvs
+        self.aspiration_window = aspiration_window
+        self.tt_size = tt_size
+        self.transposition_table = TranspositionTable(tt_size) if tt_size else None
+        # seconds per ai move; when set, search deepens 1, 2, 3... until time runs out
+        # (capped at ai_search_depth if that is also set)
+        self.time_limit = time_limit
+        self.deadline = None
+        self.move_ordering = move_ordering
+        self.incremental_eval = incremental_eval
+        self.evaluator = None
+        # bytes of move masks kept between searches (and moves) of this engine; 0 turns it off
+        self.move_cache = MoveCache(move_cache) if move_cache else None
+        # processes for root-split search at fixed depth; 1 searches on this process only
+        self.workers = workers
+        self.pool = None
+        # per-move SearchStats; off by default since timing every node costs a little
+        self.collect_stats = collect_stats
+        self.stats_log = stats_log
+        self.stats = None
+        self.last_stats = None
+        # path of an opening_book.py file; positions found there are answered without searching
+        self.opening_book = open_book(opening_book) if opening_book else None
+        # once the side to move has at most this many camp squares left to fill, play the
+        # endgame solver's shortest finish instead of searching (0 turns it off)
+        self.endgame_threshold = endgame_threshold
+        self.endgame = EndgameSolver(board_size, endgame_table) if endgame_threshold else None
+        # seconds the last full search took; without a time_limit the solver gets as long
+        self.last_search_time = 0.0
+        self.nodes = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.root_depth = ai_search_depth
+        self.last_search_depth = 0
+        self.green_score = 0
+        self.red_score = 0
+        self.green_to_win = 0
+        self.red_to_win = 0
+        self.green_goals = []
+        self.red_goals = []
+        self.turn = "red"
+        
+        for row in range(board_size):
+            for col in range(board_size):
+                self.board[(row, col)] = 'empty'
+        
+        red_goals, green_goals = get_goal_camps(board_size)
+        for cell in red_goals:
+            self.red_goals.append(cell)
+            self.board[cell] = 'red'
+            self.red_to_win += 1
+                
+        for cell in green_goals:
+            self.green_goals.append(cell)
+            self.board[cell] ='green'
+            self.green_to_win += 1
+
+        geometry = get_geometry(board_size)
+        self.red_goal_mask = geometry.mask_of(self.red_goals)
+        self.green_goal_mask = geometry.mask_of(self.green_goals)
+        # "manhattan" or "king" (diagonal steps count as one, matching MOVE_DIRS)
+        self.distance_metric = distance_metric
+        self.goal_distances = goal_distances = get_goal_distances(board_size, distance_metric)
+        self.move_orderer = MoveOrderer(board_size, goal_distances)
+        # what one piece on each square adds to utility_fn, before mobility
+        self.piece_values = {
+            "red": [board_size * 2 if cell in self.green_goals else -goal_distances["red"][index]
+                    for index, cell in enumerate(geometry.cells)],
+            "green": [-board_size * 2 if cell in self.red_goals else goal_distances["green"][index]
+                      for index, cell in enumerate(geometry.cells)],
+        }
+        # score all children of depth-1 nodes in one NumPy call (approximate mobility, see batch_eval.py)
+        self.batch_evaluator = None
+        if batch_eval:
+            # numpy is only needed when this is on
+            from batch_eval import BatchEvaluator
+            self.batch_evaluator = BatchEvaluator(board_size, self.piece_values)
+
+    def legal_moves(self, color = None):
+        """Every (from_cell, to_cell) move available to color (the side to move by default)"""
+        return list(self.ai_get_next_moves(self.board, color or self.turn))
+
+    def is_legal_move(self, from_cell, to_cell):
+        if self.winner() is not None or self.board.get(from_cell) != self.turn:
+            return False
+        return to_cell in MoveGenerator.get_reachable(from_cell, self.board, self.board_size)
+
+    def play_move(self, from_cell, to_cell):
+        """Move the piece on from_cell to to_cell, updating scores and passing the turn"""
+        if self.board[from_cell] == "red":
+            if from_cell in self.green_goals:
+                self.red_score -= 1
+                self.red_to_win += 1
+            if to_cell in self.green_goals:
+                self.red_score += 1
+                self.red_to_win -= 1
+            self.turn = "green"  
+
+        elif self.board[from_cell] == "green":
+            if from_cell in self.red_goals:
+                self.green_score -= 1
+                self.green_to_win += 1
+            if to_cell in self.red_goals:
+                self.green_score += 1
+                self.green_to_win -= 1 
+            self.turn = "red"  
+
+        self.board[to_cell] = self.board[from_cell]
+        self.board[from_cell] = "empty"
+
+    def winner(self):
+        if self.red_to_win == 0:
+            return "red"
+        elif self.green_to_win == 0:
+            return "green"
+        return None
+
+    def position(self):
+        return Bitboard.from_dict(self.board, self.board_size)
+
+    def minmax(self, board, depth, alpha = float("-inf"), beta = float("inf"), maximizing = False):
+        # green is min, red is max
+        # ai will always be green
+        if not isinstance(board, Bitboard):
+            board = Bitboard.from_dict(board, self.board_size)
+        self.new_search(board)
+        self.root_depth = self.ai_search_depth
+        if self.pvs:
+            # pvs_search scores from the side to move's point of view
+            if maximizing:
+                return self.pvs_search(board, self.ai_search_depth - depth, alpha, beta, True)
+            return -self.pvs_search(board, self.ai_search_depth - depth, -beta, -alpha, False)
+        return self.search(board, self.ai_search_depth - depth, alpha, beta, maximizing)
+
+    def endgame_budget(self):
+        """Seconds the endgame solver may spend on a move: half the time limit, or what a search took"""
+        if self.time_limit is not None:
+            return self.time_limit / 2
+        return max(self.last_search_time, MIN_ENDGAME_SECONDS)
+
+    def get_ai_move(self, board = None, color = "green", return_stats = False):
+        """
+        Pick a (from_cell, to_cell) move for color, or None when it has no moves
+
+        With time_limit set this runs iterative deepening and returns the best
+        move of the last iteration that finished before the deadline; the
+        depth reached is left in self.last_search_depth
+
+        With collect_stats on, the move's SearchStats are kept in self.last_stats,
+        appended to stats_log if given, and returned as (move, stats) when
+        return_stats is set
+        """
+        if board is None:
+            board = self.board
+        if not isinstance(board, Bitboard):
+            board = Bitboard.from_dict(board, self.board_size)
+        known_move = None
+        if self.opening_book is not None:
+            book_move = self.opening_book.lookup(board, color)
+            if book_move is not None and board.pieces(color) >> book_move[0] & 1 and \
+            board.get_move_mask(book_move[0]) >> book_move[1] & 1:
+                known_move = book_move
+        if known_move is None and self.endgame is not None and \
+        0 < self.endgame.to_win(board, color) <= self.endgame_threshold:
+            known_move = self.endgame.best_move(board, color, time.perf_counter() + self.endgame_budget())
+        if known_move is not None:
+            self.last_search_depth = 0
+            self.stats = None
+            if self.collect_stats:
+                self.stats = self.last_stats = SearchStats(color)
+                self.stats.finish(0)
+            cells = board.geometry.cells
+            move = cells[known_move[0]], cells[known_move[1]]
+            return (move, self.stats) if return_stats else move
+        search_start = time.perf_counter()
+        self.new_search(board, color)
+        maximizing = color == "red"
+        root_moves = list(board.generate_moves(color))
+        if not root_moves:
+            return (None, self.stats) if return_stats else None
+        if self.stats is not None:
+            self.stats.visit(0)
+            self.stats.interior_nodes += 1
+            self.stats.children_searched += len(root_moves)
+        if self.move_ordering:
+            root_moves = self.move_orderer.order(root_moves, color, self.get_tt_move(board, maximizing))
+
+        if self.time_limit is None:
+            self.root_depth = self.ai_search_depth
+            if self.pvs:
+                best_move, scores = self.search_root_pvs(board, self.ai_search_depth, maximizing, root_moves)
+            elif self.workers > 1:
+                best_move, scores = self.search_root_parallel(board, self.ai_search_depth, maximizing, root_moves)
+            else:
+                best_move, scores = self.search_root(board, self.ai_search_depth, maximizing, root_moves)
+            self.last_search_depth = self.ai_search_depth
+        else:
+            deadline = time.perf_counter() + self.time_limit
+            history_len = len(board.history)
+            best_move = root_moves[0]
+            previous = None
+            depth = 0
+            while not self.ai_search_depth or depth < self.ai_search_depth:
+                depth += 1
+                self.root_depth = depth
+                # the first iteration always runs to completion so there is a move to return
+                self.deadline = deadline if depth > 1 else None
+                try:
+                    if self.pvs:
+                        best_move, scores = self.aspiration_search(board, depth, maximizing, root_moves, previous)
+                        previous = scores[best_move]
+                    else:
+                        best_move, scores = self.search_root(board, depth, maximizing, root_moves)
+                except SearchTimeout:
+                    while len(board.history) > history_len:
+                        self.undo_move(board)
+                    depth -= 1
+                    break
+                # next iteration tries the moves in order of this iteration's scores
+                root_moves.sort(key=lambda move: scores[move], reverse=maximizing)
+                if time.perf_counter() >= deadline:
+                    break
+            self.deadline = None
+            self.last_search_depth = depth
+
+        self.last_search_time = time.perf_counter() - search_start
+        if self.debug:
+            print(f"Searched to depth {self.last_search_depth}")
+        if self.stats is not None:
+            self.stats.finish(self.last_search_depth)
+            self.last_stats = self.stats
+            if self.stats_log:
+                self.stats.write_json(self.stats_log)
+        cells = board.geometry.cells
+        move = cells[best_move[0]], cells[best_move[1]]
+        return (move, self.stats) if return_stats else move
+
+    def new_search(self, position, color = None):
+        self.stats = SearchStats(color) if self.collect_stats else None
+        position.move_cache = self.move_cache
+        self.evaluator = None
+        if self.incremental_eval:
+            self.evaluator = IncrementalEvaluator(position, self.piece_values["red"], self.piece_values["green"])
+        self.nodes = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        if self.transposition_table is not None:
+            self.transposition_table.new_search()
+        self.move_orderer.new_search()
+
+    def cutoff_rate(self):
+        """Fraction of cutoffs that came from the first move searched at a node"""
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    def get_tt_move(self, position, maximizing):
+        if self.transposition_table is None:
+            return None
+        key = (position.hash ^ position.zobrist.red_to_move) if maximizing else position.hash
+        entry = self.transposition_table.probe(key)
+        return entry[4] if entry is not None else None
+
+    def search_root(self, position, depth_left, maximizing, root_moves):
+        """Search each root move and return (best_move, {move: utility})"""
+        alpha = float("-inf")
+        beta = float("inf")
+        scores = {}
+        best_move = root_moves[0]
+        for move in root_moves:
+            self.apply_move(position, move)
+            utility = self.search(position, depth_left - 1, alpha, beta, not maximizing)
+            self.undo_move(position)
+            scores[move] = utility
+            if maximizing and utility > scores[best_move] or not maximizing and utility < scores[best_move]:
+                best_move = move
+            if self.pruning:
+                if maximizing:
+                    alpha = max(alpha, utility)
+                else:
+                    beta = min(beta, utility)
+        return best_move, scores
+
+    def search_root_pvs(self, position, depth_left, maximizing, root_moves, alpha = float("-inf"),
+                        beta = float("inf")):
+        """
+        search_root for pvs: the first move gets the (alpha, beta) window, the
+        rest a null window that is only widened when a move beats the best so
+        far. alpha and beta are from the side to move's point of view; the
+        returned scores are from red's, like search_root's
+        """
+        sign = 1 if maximizing else -1
+        scores = {}
+        best_move = root_moves[0]
+        best_value = float("-inf")
+        for move_num, move in enumerate(root_moves):
+            self.apply_move(position, move)
+            if move_num == 0 or alpha == float("-inf"):
+                value = -self.pvs_search(position, depth_left - 1, -beta, -alpha, not maximizing)
+            else:
+                value = -self.pvs_search(position, depth_left - 1, -alpha - 1, -alpha, not maximizing)
+                if alpha < value < beta:
+                    value = -self.pvs_search(position, depth_left - 1, -beta, -value, not maximizing)
+            self.undo_move(position)
+            scores[move] = sign * value
+            if value > best_value:
+                best_value = value
+                best_move = move
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+        return best_move, scores
+
+    def aspiration_search(self, position, depth_left, maximizing, root_moves, previous):
+        """search_root_pvs in a window around the previous iteration's score (red's point of view)"""
+        if previous is None or not self.aspiration_window or abs(previous) == float("inf"):
+            return self.search_root_pvs(position, depth_left, maximizing, root_moves)
+        sign = 1 if maximizing else -1
+        alpha = sign * previous - self.aspiration_window
+        beta = sign * previous + self.aspiration_window
+        best_move, scores = self.search_root_pvs(position, depth_left, maximizing, root_moves, alpha, beta)
+        value = sign * scores[best_move]
+        if value <= alpha or value >= beta:
+            if self.debug:
+                print(f"Aspiration window missed at depth {depth_left}, searching again")
+            return self.search_root_pvs(position, depth_left, maximizing, root_moves)
+        return best_move, scores
+
+    def search_root_parallel(self, position, depth_left, maximizing, root_moves):
+        """
+        search_root split across self.workers processes
+
+        The first root move is searched here with a full window; the rest go to
+        the pool in order, each with the best bound known when it is sent, so
+        a move only comes back with an exact score if it beats that bound.
+        Ties go to the earlier move, which gives the same answer as search_root
+        """
+        first_move = root_moves[0]
+        self.apply_move(position, first_move)
+        bound = self.search(position, depth_left - 1, float("-inf"), float("inf"), not maximizing)
+        self.undo_move(position)
+        scores = {first_move: bound}
+
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(self.workers)
+        worker_settings = dict(self.settings, workers = 1)
+        pending = {}
+        next_moves = iter(root_moves[1:])
+        while True:
+            while len(pending) < self.workers:
+                move = next(next_moves, None)
+                if move is None:
+                    break
+                alpha = float("-inf")
+                beta = float("inf")
+                if self.pruning:
+                    if maximizing:
+                        alpha = bound
+                    else:
+                        beta = bound
+                future = self.pool.submit(search_move_in_worker, self.board_size, worker_settings,
+                                          position.red, position.green, move, depth_left, maximizing, alpha, beta)
+                pending[future] = move
+            if not pending:
+                break
+            done, not_done = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                move = pending.pop(future)
+                utility, nodes = future.result()
+                self.nodes += nodes
+                if self.stats is not None:
+                    self.stats.worker_nodes += nodes
+                scores[move] = utility
+                if maximizing and utility > bound or not maximizing and utility < bound:
+                    bound = utility
+
+        best_move = first_move
+        for move in root_moves:
+            if maximizing and scores[move] > scores[best_move] or not maximizing and scores[move] < scores[best_move]:
+                best_move = move
+        return best_move, scores
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    def search(self, position, depth_left, alpha, beta, maximizing):
+        """
+        minmax over a single Bitboard that is updated in place: each move is
+        applied with apply_move, searched, then undone with undo_move, so no
+        child boards are ever allocated
+        """
+        self.nodes += 1
+        if self.deadline is not None and not self.nodes & 255 and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+        depth = self.root_depth - depth_left
+        stats = self.stats
+        if stats is not None:
+            stats.visit(depth)
+        if self.is_terminal_state(position) or depth_left <= 0:
+            if stats is not None:
+                stats.leaf_evals += 1
+                start = time.perf_counter()
+                utility = self.evaluate(position)
+                stats.eval_time += time.perf_counter() - start
+                return utility
+            return self.evaluate(position)
+
+        table = self.transposition_table
+        tt_move = None
+        if table is not None:
+            key = (position.hash ^ position.zobrist.red_to_move) if maximizing else position.hash
+            entry = table.probe(key)
+            if entry is not None:
+                tt_move = entry[4]
+                if entry[1] >= depth_left:
+                    value, flag = entry[2], entry[3]
+                    if flag == EXACT:
+                        return value
+                    if flag == LOWER:
+                        alpha = max(alpha, value)
+                    else:
+                        beta = min(beta, value)
+                    if beta <= alpha:
+                        return value
+        alpha_orig = alpha
+        beta_orig = beta
+        best_move = None
+        color = "red" if maximizing else "green"
+        if stats is not None:
+            start = time.perf_counter()
+        moves = position.generate_moves(color)
+        if self.move_ordering:
+            moves = self.move_orderer.order(moves, color, tt_move, depth)
+        if stats is not None:
+            moves = list(moves)
+            stats.movegen_time += time.perf_counter() - start
+            stats.interior_nodes += 1
+            stats.children_searched += len(moves)
+
+        batch = depth_left == 1 and self.batch_evaluator is not None
+        if batch:
+            moves = list(moves)
+        if batch and moves:
+            if stats is not None:
+                start = time.perf_counter()
+            utilities = self.batch_evaluator.evaluate_children(position, moves, color)
+            best = int(utilities.argmax() if maximizing else utilities.argmin())
+            best_utility = int(utilities[best])
+            best_move = moves[best]
+            self.nodes += len(moves)
+            if stats is not None:
+                stats.eval_time += time.perf_counter() - start
+                stats.leaf_evals += len(moves)
+                stats.nodes_per_depth[depth + 1] = stats.nodes_per_depth.get(depth + 1, 0) + len(moves)
+        elif maximizing:
+            best_utility = float("-inf")
+            for move_num, move in enumerate(moves):
+                self.apply_move(position, move)
+                utility = self.search(position, depth_left - 1, alpha, beta, False)
+                self.undo_move(position)
+                if utility > best_utility:
+                    best_utility = utility
+                    best_move = move
+                if self.pruning:
+                    alpha = max(alpha, best_utility)
+                    if beta <= alpha:
+                        self.record_cutoff(move, move_num, depth, depth_left)
+                        if self.debug:
+                            print(f"Pruning from max node at depth {depth}")
+                        break
+                
+        else:
+            best_utility = float("inf")
+            for move_num, move in enumerate(moves):
+                self.apply_move(position, move)
+                utility = self.search(position, depth_left - 1, alpha, beta, True)
+                self.undo_move(position)
+                if utility < best_utility:
+                    best_utility = utility
+                    best_move = move
+                if self.pruning:
+                    beta = min(beta, best_utility)
+                    if beta <= alpha:
+                        self.record_cutoff(move, move_num, depth, depth_left)
+                        if self.debug:
+                            print(f"Pruning from min node at depth {depth}")
+                        break
+
+        if table is not None:
+            if best_utility <= alpha_orig:
+                flag = UPPER
+            elif best_utility >= beta_orig:
+                flag = LOWER
+            else:
+                flag = EXACT
+            table.store(key, depth_left, best_utility, flag, best_move)
+        return best_utility
+    
+    def pvs_search(self, position, depth_left, alpha, beta, maximizing):
+        """
+        search in negamax form with principal variation search
+
+        Values are from the point of view of the side to move (red when
+        maximizing), so one branch serves both sides. The first move is
+        searched with the full (alpha, beta) window and every later move with
+        a null window (alpha, alpha + 1) that only proves it is no better;
+        a move that fails high is searched again with a real window.
+        Transposition table entries stay in red's point of view so they are
+        shared with search
+        """
+        self.nodes += 1
+        if self.deadline is not None and not self.nodes & 255 and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+        depth = self.root_depth - depth_left
+        sign = 1 if maximizing else -1
+        stats = self.stats
+        if stats is not None:
+            stats.visit(depth)
+        if self.is_terminal_state(position) or depth_left <= 0:
+            if stats is not None:
+                stats.leaf_evals += 1
+                start = time.perf_counter()
+                utility = self.evaluate(position)
+                stats.eval_time += time.perf_counter() - start
+                return sign * utility
+            return sign * self.evaluate(position)
+
+        table = self.transposition_table
+        tt_move = None
+        if table is not None:
+            key = (position.hash ^ position.zobrist.red_to_move) if maximizing else position.hash
+            entry = table.probe(key)
+            if entry is not None:
+                tt_move = entry[4]
+                if entry[1] >= depth_left:
+                    value, flag = sign * entry[2], entry[3]
+                    if flag != EXACT and not maximizing:
+                        # a lower bound for red is an upper bound for green
+                        flag = UPPER if flag == LOWER else LOWER
+                    if flag == EXACT:
+                        return value
+                    if flag == LOWER:
+                        alpha = max(alpha, value)
+                    else:
+                        beta = min(beta, value)
+                    if beta <= alpha:
+                        return value
+        alpha_orig = alpha
+        best_move = None
+        color = "red" if maximizing else "green"
+        if stats is not None:
+            start = time.perf_counter()
+        moves = position.generate_moves(color)
+        if self.move_ordering:
+            moves = self.move_orderer.order(moves, color, tt_move, depth)
+        if stats is not None:
+            moves = list(moves)
+            stats.movegen_time += time.perf_counter() - start
+            stats.interior_nodes += 1
+            stats.children_searched += len(moves)
+
+        best_value = float("-inf")
+        for move_num, move in enumerate(moves):
+            self.apply_move(position, move)
+            if move_num == 0 or alpha == float("-inf"):
+                value = -self.pvs_search(position, depth_left - 1, -beta, -alpha, not maximizing)
+            else:
+                value = -self.pvs_search(position, depth_left - 1, -alpha - 1, -alpha, not maximizing)
+                if alpha < value < beta:
+                    value = -self.pvs_search(position, depth_left - 1, -beta, -value, not maximizing)
+            self.undo_move(position)
+            if value > best_value:
+                best_value = value
+                best_move = move
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                self.record_cutoff(move, move_num, depth, depth_left)
+                if self.debug:
+                    print(f"Pruning at depth {depth}")
+                break
+
+        if table is not None:
+            if best_value <= alpha_orig:
+                flag = UPPER
+            elif best_value >= beta:
+                flag = LOWER
+            else:
+                flag = EXACT
+            if flag != EXACT and not maximizing:
+                flag = UPPER if flag == LOWER else LOWER
+            table.store(key, depth_left, sign * best_value, flag, best_move)
+        return best_value
+
+    def apply_move(self, position, move):
+        if self.evaluator is not None and self.evaluator.position is position:
+            self.evaluator.make_move(*move)
+        else:
+            position.make_move(*move)
+
+    def undo_move(self, position):
+        if self.evaluator is not None and self.evaluator.position is position:
+            return self.evaluator.unmake_move()
+        return position.unmake_move()
+
+    def evaluate(self, position):
+        if self.evaluator is not None and self.evaluator.position is position:
+            return self.evaluator.utility()
+        return self.utility_fn(position)
+
+    def record_cutoff(self, move, move_num, depth, depth_left):
+        self.cutoffs += 1
+        if move_num == 0:
+            self.first_move_cutoffs += 1
+        if self.stats is not None:
+            self.stats.cutoff(depth)
+        if self.move_ordering:
+            self.move_orderer.record_cutoff(move, depth, depth_left)
+
+    def ai_get_next_moves(self, board, color = "green"):
+        if not isinstance(board, Bitboard):
+            board = Bitboard.from_dict(board, self.board_size)
+        cells = board.geometry.cells
+        for from_index, to_index in board.generate_moves(color):
+            yield cells[from_index], cells[to_index]
+    
+    def utility_fn(self, board):
+        """
+        utility considerations:
+            Favor pieces closer to/in goals
+            Favor pieces that have many move options
+            
+        (+) is better for red, (-) is better for green
+        """
+        if isinstance(board, Bitboard):
+            return self.bitboard_utility(board)
+        utility = 0
+        for cell, state in board.items():
+            if state == "red":
+                if cell not in self.green_goals:
+                    utility -= self.goal_distances["red"][cell[0] * self.board_size + cell[1]]
+                else:
+                    utility += self.board_size * 2
+                utility += len(MoveGenerator.get_reachable(cell, board, self.board_size))
+            if state == "green":
+                if cell not in self.red_goals:
+                    utility += self.goal_distances["green"][cell[0] * self.board_size + cell[1]]
+                else:
+                    utility -= self.board_size * 2
+                utility -= len(MoveGenerator.get_reachable(cell, board, self.board_size))
+
+        return utility
+
+    def bitboard_utility(self, board):
+        red_values = self.piece_values["red"]
+        green_values = self.piece_values["green"]
+        utility = 0
+        for index in iter_bits(board.red):
+            utility += red_values[index] + board.count_moves(index)
+        for index in iter_bits(board.green):
+            utility += green_values[index] - board.count_moves(index)
+
+        return utility
+        
+    def is_terminal_state(self, board):
+        if isinstance(board, Bitboard):
+            return board.green & self.red_goal_mask == self.red_goal_mask or \
+                board.red & self.green_goal_mask == self.green_goal_mask
+
+        for goal in self.red_goals:
+            if board[goal] != "green":
+                break
+        else:
+            return True
+
+        for goal in self.green_goals:
+            if board[goal] != "red":
+                break
+        else:
+            return True
+
+        return False
+
+class MoveGenerator:
+    def get_moves(cell, game_board, board_size):
+        if isinstance(game_board, Bitboard):
+            return game_board.get_moves(cell)
+        adjacency = get_geometry(board_size).adjacency
+        move_stack = [[cell, [cell]]]
+        valid_moves = []
+                
+        while move_stack:
+            curr_cell, path = move_stack.pop()
+        
+            for move, jump_move in adjacency[curr_cell]:
+                if move not in path:
+                    if game_board[move] == "red" or game_board[move] == "green":
+                        if jump_move is not None and game_board[jump_move] == "empty" and jump_move not in path:
+                            valid_moves.append(jump_move)
+                            if MoveGenerator.check_for_surrounding_piece(jump_move, game_board, board_size):
+                                move_stack.append([jump_move, path + [jump_move]])
+                    elif curr_cell == cell:
+                        valid_moves.append(move)
+        
+        return valid_moves
+
+    def get_reachable(cell, game_board, board_size, return_paths = False):
+        """
+        Same destinations as get_moves, but each landing square is visited once
+        (breadth first, with a visited set over the whole jump chain) so the
+        result has no duplicates and runs in time linear in the squares reached
+
+        With return_paths=True returns one shortest hop sequence per destination,
+        each starting at cell and ending at the destination
+        """
+        if isinstance(game_board, Bitboard):
+            return game_board.get_moves(cell)
+        adjacency = get_geometry(board_size).adjacency
+        parents = {cell: None}
+        queue = [cell]
+
+        for move, jump_move in adjacency[cell]:
+            if game_board[move] == "empty":
+                parents[move] = cell
+
+        for curr_cell in queue:
+            for move, jump_move in adjacency[curr_cell]:
+                if jump_move is not None and move != cell and jump_move not in parents and \
+                (game_board[move] == "red" or game_board[move] == "green") and game_board[jump_move] == "empty":
+                    parents[jump_move] = curr_cell
+                    queue.append(jump_move)
+
+        del parents[cell]
+        if not return_paths:
+            return list(parents)
+
+        paths = []
+        for dest in parents:
+            path = [dest]
+            while path[-1] != cell:
+                path.append(parents[path[-1]])
+            path.reverse()
+            paths.append(path)
+        return paths
+    
+    def manhattan_distance(cell1, cell2):
+        x1, y1 = cell1
+        x2, y2 = cell2
+        return abs(x2 - x1) + abs(y2 - y1)
+
+    def get_closest_goal_distance(cell, goals):
+        closest_val = float('inf')
+        for goal in goals:
+            closest_val = min(closest_val, MoveGenerator.manhattan_distance(cell, goal))
+            
+        return closest_val
+            
+
+    def check_for_surrounding_piece(cell, board, board_size):
+        for adj_cell in get_geometry(board_size).neighbors[cell]:
+            if board[adj_cell] == "red" or board[adj_cell] == "green":
+                return True
+        return False
+        
+    def valid_cell(row, col, board_size):
+        return row < board_size and row > -1 and col < board_size and col > -1
@@ -0,0 +1,67 @@
+from geometry import iter_bits
+
+class IncrementalEvaluator:
+    """
+    Keeps GameManager.utility_fn's value for one Bitboard up to date as moves are made and undone
+
+    The goal-distance / in-goal part is a sum of per-square values, so each
+    move changes it by values[to] - values[from]. Mobility is cached per piece
+    together with the squares its move generation looked at, and an entry is
+    dropped only when a move changes one of those squares
+    """
+    def __init__(self, position, red_values, green_values):
+        self.position = position
+        self.red_values = red_values
+        self.green_values = green_values
+        self.material = 0
+        for index in iter_bits(position.red):
+            self.material += red_values[index]
+        for index in iter_bits(position.green):
+            self.material += green_values[index]
+        # index -> (signed number of moves, mask of squares the count depends on)
+        self.mobility = {}
+        self.mobility_total = 0
+        self.cached_mask = 0
+        self.undo_stack = []
+
+    def make_move(self, from_index, to_index):
+        position = self.position
+        values = self.red_values if position.red >> from_index & 1 else self.green_values
+        delta = values[to_index] - values[from_index]
+        self.material += delta
+        saved = self.invalidate((1 << from_index) | (1 << to_index))
+        position.make_move(from_index, to_index)
+        self.undo_stack.append((delta, saved))
+
+    def unmake_move(self):
+        delta, saved = self.undo_stack.pop()
+        from_index, to_index = self.position.unmake_move()
+        self.material -= delta
+        # entries cached below this move that depend on the moved squares are stale again
+        self.invalidate((1 << from_index) | (1 << to_index))
+        for index, entry in saved:
+            self.add_entry(index, entry)
+        return from_index, to_index
+
+    def add_entry(self, index, entry):
+        self.mobility[index] = entry
+        self.mobility_total += entry[0]
+        self.cached_mask |= 1 << index
+
+    def invalidate(self, changed):
+        stale = [(index, entry) for index, entry in self.mobility.items() if entry[1] & changed]
+        for index, entry in stale:
+            del self.mobility[index]
+            self.mobility_total -= entry[0]
+            self.cached_mask ^= 1 << index
+        return stale
+
+    def utility(self):
+        position = self.position
+        for index in iter_bits(position.red & ~self.cached_mask):
+            move_mask, reach = position.get_move_mask_with_reach(index)
+            self.add_entry(index, (move_mask.bit_count(), reach))
+        for index in iter_bits(position.green & ~self.cached_mask):
+            move_mask, reach = position.get_move_mask_with_reach(index)
+            self.add_entry(index, (-move_mask.bit_count(), reach))
+        return self.material + self.mobility_total
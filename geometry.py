@@ -0,0 +1,127 @@
+MOVE_DIRS = [(1, 0), (-1, 0), (0, 1), (0, -1), (-1, 1), (1, 1), (-1, -1), (1, -1)]
+
+_geometries = {}
+
+class BoardGeometry:
+    """
+    Static layout information for one board size, built once and shared
+
+    Squares are numbered row-major, so cell (row, col) is bit row * board_size + col
+    """
+    def __init__(self, board_size):
+        self.board_size = board_size
+        self.num_cells = board_size * board_size
+        self.full_mask = (1 << self.num_cells) - 1
+        self.cells = [(row, col) for row in range(board_size) for col in range(board_size)]
+        self.neighbor_masks = []
+        # per square: list of (over_bit, land_bit, land_index) for every in-bounds jump
+        self.jumps = []
+        # per cell: list of (neighbor, landing) where landing is the cell reached by
+        # jumping over neighbor, or None when that jump would leave the board
+        self.adjacency = {}
+        self.neighbors = {}
+
+        for row, col in self.cells:
+            neighbor_mask = 0
+            jumps = []
+            adjacency = []
+            for row_change, col_change in MOVE_DIRS:
+                over = (row + row_change, col + col_change)
+                if not self.in_bounds(over):
+                    continue
+                over_bit = 1 << self.index(over)
+                neighbor_mask |= over_bit
+                land = (over[0] + row_change, over[1] + col_change)
+                if self.in_bounds(land):
+                    land_index = self.index(land)
+                    jumps.append((over_bit, 1 << land_index, land_index))
+                    adjacency.append((over, land))
+                else:
+                    adjacency.append((over, None))
+            self.neighbor_masks.append(neighbor_mask)
+            self.jumps.append(jumps)
+            self.adjacency[(row, col)] = adjacency
+            self.neighbors[(row, col)] = [over for over, land in adjacency]
+
+    def in_bounds(self, cell):
+        row, col = cell
+        return 0 <= row < self.board_size and 0 <= col < self.board_size
+
+    def index(self, cell):
+        return cell[0] * self.board_size + cell[1]
+
+    def mask_of(self, cells):
+        mask = 0
+        for cell in cells:
+            mask |= 1 << self.index(cell)
+        return mask
+
+def get_geometry(board_size):
+    geometry = _geometries.get(board_size)
+    if geometry is None:
+        geometry = _geometries[board_size] = BoardGeometry(board_size)
+    return geometry
+
+def iter_bits(mask):
+    while mask:
+        low_bit = mask & -mask
+        yield low_bit.bit_length() - 1
+        mask ^= low_bit
+
+_goal_camps = {}
+_goal_distances = {}
+
+def get_goal_camps(board_size):
+    """
+    (red_goals, green_goals): the corner triangles red and green start in
+
+    Red wins by filling green_goals and green by filling red_goals
+    """
+    camps = _goal_camps.get(board_size)
+    if camps is None:
+        red_goals = []
+        green_goals = []
+        half_board_size = board_size // 2
+        for row in range(half_board_size):
+            for col in range(half_board_size - row):
+                red_goals.append((row, col))
+        for row in range(board_size - 1, half_board_size - 1, - 1):
+            for col in range(board_size - 1, (half_board_size - 1) + (board_size - 1 - row), - 1):
+                green_goals.append((row, col))
+        camps = _goal_camps[board_size] = (tuple(red_goals), tuple(green_goals))
+    return camps
+
+def manhattan_distance(cell1, cell2):
+    return abs(cell2[0] - cell1[0]) + abs(cell2[1] - cell1[1])
+
+def king_distance(cell1, cell2):
+    # number of single steps when diagonal steps are allowed, as in MOVE_DIRS
+    return max(abs(cell2[0] - cell1[0]), abs(cell2[1] - cell1[1]))
+
+DISTANCE_METRICS = {"manhattan": manhattan_distance, "king": king_distance}
+
+def get_goal_distances(board_size, metric = "manhattan"):
+    """
+    {color: per-square distance to the closest goal that color is heading for}
+
+    Built once per (board_size, metric) and shared by every caller
+    """
+    key = (board_size, metric)
+    distances = _goal_distances.get(key)
+    if distances is None:
+        distance_fn = DISTANCE_METRICS[metric]
+        red_goals, green_goals = get_goal_camps(board_size)
+        cells = get_geometry(board_size).cells
+        distances = _goal_distances[key] = {
+            "red": tuple(min(distance_fn(cell, goal) for goal in green_goals) for cell in cells),
+            "green": tuple(min(distance_fn(cell, goal) for goal in red_goals) for cell in cells),
+        }
+    return distances
+
+def cell_name(cell):
+    """Board label of a cell as shown by the GUI: column letter then 1-based row, e.g. (2, 0) -> 'a3'"""
+    row, col = cell
+    return f"{chr(ord('a') + col)}{row + 1}"
+
+def parse_cell(name):
+    return int(name[1:]) - 1, ord(name[0]) - ord('a')
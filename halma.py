@@ -1,216 +1,156 @@
 import tkinter as tk
 from math import dist
+from ai_worker import BackgroundSearch
+from engine import HalmaEngine, MoveGenerator
 
 GRID_CELL_SIZE = 50
 GAME_PIECE_PADDING = 5
-MOVE_DIRS = [(1, 0), (-1, 0), (0, 1), (0, -1), (-1, 1), (1, 1), (-1, -1), (1, -1)]
-
-class MinMaxNode:
-    def __init__(self, board, utility, parent = None):
-        self.board = board
-        self.utility = utility
-        self.parent = parent
-        self.alpha= float("-inf")
-        self.beta = float("inf")
-
-class GameManager:
-    def __init__(self, board_size, ai_search_depth = 0, pruning = False, debug = False):
-        self.board = {}
-        self.board_size = board_size
-        self.ai_search_depth = ai_search_depth
-        self.debug = debug
-        self.pruning = pruning
-        self.green_score = 0
-        self.red_score = 0
-        self.green_to_win = 0
-        self.red_to_win = 0
+# room for the row / column labels around a CanvasBoard
+BOARD_MARGIN = 20
+# how often the Tk loop checks whether the background search has finished
+AI_POLL_MS = 50
+
+class GameManager(HalmaEngine):
+    def __init__(self, root, board_size, renderer = "cells", ai_color = None, ponder = 3, **settings):
+        super().__init__(board_size, **settings)
+        # the Tk window everything is drawn in
+        self.root = root
         self.selected_piece = None
-        self.green_goals = []
-        self.red_goals = []
-        self.turn = "red"
-        
-        for row in range(board_size):
-            for col in range(board_size):
-                self.board[(row, col)] = 'empty'
-        
-        half_board_size = board_size // 2
-        for row in range(half_board_size):
-            for col in range(half_board_size - row):
-                self.red_goals.append((row, col))
-                self.board[(row, col)] = 'red'
-                self.red_to_win += 1
-                
-        for row in range(board_size - 1, half_board_size - 1, - 1):
-            for col in range(board_size - 1, (half_board_size - 1) + (board_size - 1 - row), - 1):
-                self.green_goals.append((row, col))
-                self.board[(row, col)] ='green'
-                self.green_to_win += 1
-
-        self.score_label_red = tk.Label(tk_root, text=f"Red Score: {self.red_score}", fg="red")
+        # "cells" draws each square as its own widget, "canvas" draws the whole board on one
+        self.renderer = renderer
+
+        self.score_label_red = tk.Label(self.root, text=f"Red Score: {self.red_score}", fg="red")
         self.score_label_red.grid(row=0, column=board_size + 1, padx=10)
-        self.goals_to_win_label_red = tk.Label(tk_root, text=f"Goals until Red Wins: {self.red_to_win}", fg="red")
+        self.goals_to_win_label_red = tk.Label(self.root, text=f"Goals until Red Wins: {self.red_to_win}", fg="red")
         self.goals_to_win_label_red.grid(row=1, column=board_size + 1, padx=10)
-        self.score_label_green = tk.Label(tk_root, text=f"Green Score: {self.green_score}", fg="green")
+        self.score_label_green = tk.Label(self.root, text=f"Green Score: {self.green_score}", fg="green")
         self.score_label_green.grid(row=2, column=board_size + 1, padx=10)
-        self.goals_to_win_label_green = tk.Label(tk_root, text=f"Goals until Green Wins: {self.green_to_win}", fg="green")
+        self.goals_to_win_label_green = tk.Label(self.root, text=f"Goals until Green Wins: {self.green_to_win}", fg="green")
         self.goals_to_win_label_green.grid(row=3, column=board_size + 1, padx=10)
-        self.curr_player = tk.Label(tk_root, text=f"{self.turn}'s turn", font=("Helvetica", 16), fg=self.turn)
+        self.curr_player = tk.Label(self.root, text=f"{self.turn}'s turn", font=("Helvetica", 16), fg=self.turn)
         self.curr_player.grid(row=4, column=self.board_size + 1, padx=10)
 
-        self.board_display = GameBoard(self.board, self, board_size)
+        self.board_display = RENDERERS[renderer](self.board, self, board_size)
+
+        # the side the computer plays (None for two humans); its moves are searched in a
+        # worker process, and while the human thinks the worker searches replies to their
+        # ponder likeliest moves
+        self.ai_color = ai_color
+        self.ponder_moves = ponder
+        self.thinker = BackgroundSearch(board_size, self.settings) if ai_color else None
+        self.poll_id = None
+        if ai_color:
+            self.next_turn()
     
     def start_move(self, cell):
         self.selected_piece = cell
-        possible_moves = MoveGenerator.get_moves(cell, self.board, self.board_size)
+        possible_moves = MoveGenerator.get_reachable(cell, self.board, self.board_size)
         self.board_display.show_moves(cell, possible_moves)
     
     def execute_move(self, dest_cell):
-        if self.board[self.selected_piece] == "red":
-            if self.selected_piece in self.green_goals:
-                self.red_score -= 1
-                self.red_to_win += 1
-            if dest_cell in self.green_goals:
-                self.red_score += 1
-                self.red_to_win -= 1
-            self.turn = "green"  
-
-        elif self.board[self.selected_piece] == "green":
-            if self.selected_piece in self.red_goals:
-                self.green_score -= 1
-                self.green_to_win += 1
-            if dest_cell in self.red_goals:
-                self.green_score += 1
-                self.green_to_win -= 1 
-            self.turn = "red"  
-             
+        from_cell = self.selected_piece
+        self.play_move(from_cell, dest_cell)
+
         self.score_label_red.config(text=f"Red Score: {self.red_score}")
         self.goals_to_win_label_red.config(text=f"Goals until Red Wins: {self.red_to_win}")
         self.score_label_green.config(text=f"Green Score: {self.green_score}")
         self.goals_to_win_label_green.config(text=f"Goals until Green Wins: {self.green_to_win}")
         self.curr_player.config(text=f"{self.turn}'s turn", fg=self.turn)
-            
-        self.board[dest_cell] = self.board[self.selected_piece]
-        self.board[self.selected_piece] = "empty"  
         self.selected_piece = None
         self.exit_move()
-        self.board_display.update(self.board)
+        self.board_display.update(self.board, (from_cell, dest_cell))
         
         self.check_winner()
+        if self.ai_color:
+            self.next_turn()
+
+    def next_turn(self):
+        if self.winner() is not None:
+            return
+        if self.turn == self.ai_color:
+            self.request_ai_move()
+        elif self.ponder_moves:
+            self.ponder()
+
+    def request_ai_move(self):
+        position = self.position()
+        if not self.thinker.is_done(position, self.ai_color) and not self.thinker.is_running(position, self.ai_color):
+            # the worker is busy with replies to moves that weren't played
+            self.thinker.cancel()
+            self.thinker.submit(position, self.ai_color)
+        self.board_display.disable()
+        self.curr_player.config(text=f"{self.turn} is thinking...", fg=self.turn)
+        self.poll_ai()
+
+    def poll_ai(self):
+        position = self.position()
+        if not self.thinker.is_done(position, self.ai_color):
+            self.poll_id = self.root.after(AI_POLL_MS, self.poll_ai)
+            return
+        self.poll_id = None
+        error = self.thinker.error(position, self.ai_color)
+        if error is not None:
+            self.curr_player.config(text=f"{self.turn}'s search failed: {error}", fg=self.turn)
+            return
+        move = self.thinker.result(position, self.ai_color)
+        if move is None:
+            self.curr_player.config(text=f"{self.turn} has no moves", fg=self.turn)
+            return
+        self.selected_piece = move[0]
+        self.execute_move(move[1])
+
+    def ponder(self):
+        """Queue searches of the positions after the human's likeliest moves"""
+        human = self.turn
+        position = self.position()
+        replies = []
+        for move in position.generate_moves(human):
+            position.make_move(*move)
+            replies.append((self.utility_fn(position), position.copy()))
+            position.unmake_move()
+        # assume the human plays what looks best one move ahead
+        replies.sort(key=lambda reply: reply[0], reverse=human == "red")
+        for utility, child in replies[:self.ponder_moves]:
+            self.thinker.submit(child, self.ai_color)
 
     def reset_game(self):
         self.play_again_button.destroy()
-        self.__init__(self.board_size)
+        if self.poll_id is not None:
+            self.root.after_cancel(self.poll_id)
+        if self.thinker is not None:
+            self.thinker.close()
+        self.close()
+        self.__init__(self.root, self.board_size, self.renderer, self.ai_color, self.ponder_moves, **self.settings)
 
     def show_play_again_button(self):
-        self.play_again_button = tk.Button(tk_root, text="Play Again", command=self.reset_game)
+        self.play_again_button = tk.Button(self.root, text="Play Again", command=self.reset_game)
         self.play_again_button.grid(row=5, column=self.board_size + 1, padx=10)
     
-    def minmax(self, board, depth, alpha = float("-inf"), beta = float("inf"), maximizing = False):
-        # green is min, red is max
-        # ai will always be green
-        if self.is_terminal_state(board) or depth == self.ai_search_depth:
-            return self.utility_fn(board)
-        next_moves = self.ai_get_next_moves(board)
-        if maximizing:
-            max_utility = float("-inf")
-            for move in next_moves:
-                utility = self.minmax(move, depth + 1, alpha, beta, False)
-                max_utility = max(max_utility, utility)
-                if self.pruning:
-                    alpha = max(alpha, max_utility)
-                    if beta <= alpha:
-                        if self.debug:
-                            print(f"Pruning from max node at depth {depth}")
-                        break
-            return max_utility
-                
-        else:
-            min_utility = float("inf")
-            for move in next_moves:
-                utility = self.minmax(move, depth + 1, alpha, beta, True)
-                min_utility = min(min_utility, utility)
-                if self.pruning:
-                    beta = min(beta, min_utility)
-                    if beta <= alpha:
-                        if self.debug:
-                            print(f"Pruning from min node at depth {depth}")
-                        break
-            return min_utility
-    
-    def ai_get_next_moves(self, board):
-        res = []
-        for cell, state in board.items():
-            if state == "green":
-                moves = MoveGenerator.get_moves(cell, board, self.board_size)
-                for move in moves:
-                    new_board = board.copy()
-                    new_board[cell] = "empty"
-                    new_board[move] = "green"
-                    res.append(new_board)
-    
-    def utility_fn(self, board):
-        """
-        utility considerations:
-            Favor pieces closer to/in goals
-            Favor pieces that have many move options
-            
-        (+) is better for red, (-) is better for green
-        """
-        utility = 0
-        for cell, state in board.items():
-            if state == "red":
-                if cell not in self.green_goals:
-                    utility -= MoveGenerator.get_closest_goal_distance(cell, self.green_goals)
-                else:
-                    utility += self.board_size * 2
-                utility += len(MoveGenerator.get_moves(cell, board, self.board_size))
-            if state == "green":
-                if cell not in self.red_goals:
-                    utility += MoveGenerator.get_closest_goal_distance(cell, self.red_goals)
-                else:
-                    utility -= board_size * 2
-                utility -= len(MoveGenerator.get_moves(cell, board, self.board_size))
-
-        return utility
-        
-    def is_terminal_state(self, board):
-        for goal in self.red_goals:
-            if board[goal] != "green":
-                break
-        else:
-            return True
-
-        for goal in self.green_goals:
-            if board[goal] != "red":
-                break
-        else:
-            return True
-
-        return False
-        
     def check_winner(self):
-        if self.red_to_win == 0:
-            self.curr_player.config(text=f"red wins!", fg="red")
-            self.show_play_again_button()
-
-        elif self.green_to_win == 0:
-            self.curr_player.config(text=f"green wins!", fg="green")
-            self.show_play_again_button()
-        else:
+        winner = self.winner()
+        if winner is None:
             return
+        self.curr_player.config(text=f"{winner} wins!", fg=winner)
+        self.show_play_again_button()
 
-        for cell in self.board_display.display_board.values():
-            cell.canvas.unbind("<Button>")
+        self.board_display.disable()
 
     def exit_move(self):
         self.board_display.exit_move_state(self.turn)
         self.selected_piece = None
 
+PIECE_COLORS = {"red": "black", "green": "white"}
+
 class GameCell:
+    """
+    One square of the board. The piece and move-dot ovals are created once and
+    shown, hidden or recolored in place; every setter is a no-op when nothing
+    changed, so redrawing a cell that did not change costs no Tk calls
+    """
     def __init__(self, row, col, game_board, manager):
         self.pos = (row, col)
         self.board = game_board
-        self.canvas = tk.Canvas(tk_root, width = GRID_CELL_SIZE, 
+        self.canvas = tk.Canvas(manager.root, width = GRID_CELL_SIZE, 
                                         height = GRID_CELL_SIZE, bg='burlywood1', 
                                                 highlightbackground='black')
         self.state = "empty"
@@ -219,17 +159,36 @@ class GameCell:
         self.green_goal = False
         self.red_goal = False
         self.manager = manager
-        
-    def clear(self):
-        self.canvas.delete("all")
-        self.canvas.unbind('<Button>')
-        self.state = "empty"
-        
-    def set_red_state(self):
-        self.canvas.create_oval(GAME_PIECE_PADDING, GAME_PIECE_PADDING, 
-                        GRID_CELL_SIZE - GAME_PIECE_PADDING, GRID_CELL_SIZE - GAME_PIECE_PADDING,
-                                    fill = "black")
-        self.state = "red"
+        # what a click does: None, "start" (pick up this piece), "move" (move here) or "cancel"
+        self.action = None
+
+        self.piece = self.canvas.create_oval(GAME_PIECE_PADDING, GAME_PIECE_PADDING, 
+                                             GRID_CELL_SIZE - GAME_PIECE_PADDING, GRID_CELL_SIZE - GAME_PIECE_PADDING,
+                                             state="hidden")
+        dot_size = 10 
+        center_x = GRID_CELL_SIZE / 2
+        center_y = GRID_CELL_SIZE / 2
+        self.dot = self.canvas.create_oval(center_x - dot_size / 2, center_y - dot_size / 2,
+                                           center_x + dot_size / 2, center_y + dot_size / 2,
+                                           fill="black", state="hidden")
+        self.canvas.bind('<Button>', self.click)
+
+    def click(self, event):
+        if self.action == "start":
+            self.manager.start_move(self.pos)
+        elif self.action == "move":
+            self.manager.execute_move(self.pos)
+        elif self.action == "cancel":
+            self.manager.exit_move()
+
+    def set_state(self, state):
+        if state == self.state:
+            return
+        if state == "empty":
+            self.canvas.itemconfig(self.piece, state="hidden")
+        else:
+            self.canvas.itemconfig(self.piece, fill=PIECE_COLORS[state], state="normal")
+        self.state = state
 
     def set_red_goal(self):
         self.canvas.config(bg="red")
@@ -239,98 +198,101 @@ class GameCell:
         self.canvas.config(bg="green")
         self.green_goal = True
     
-    def set_green_state(self):
-        self.canvas.create_oval(GAME_PIECE_PADDING, GAME_PIECE_PADDING, 
-                        GRID_CELL_SIZE - GAME_PIECE_PADDING, GRID_CELL_SIZE - GAME_PIECE_PADDING,
-                                    fill = "white")
-        self.state = "green"
-    
-    def make_moveable(self):
-        self.canvas.bind('<Button>', lambda event: manager.start_move(self.pos))
+    def set_action(self, action):
+        self.action = action
         
-    def highlight(self):
+    def set_highlight(self, highlighted):
+        if highlighted == self.highlighted:
+            return
         if self.state == "empty":
-            dot_size = 10 
-            center_x = GRID_CELL_SIZE / 2
-            center_y = GRID_CELL_SIZE / 2
-            self.canvas.create_oval(center_x - dot_size / 2, center_y - dot_size / 2,
-                                center_x + dot_size / 2, center_y + dot_size / 2,
-                                fill="black")
-            self.canvas.bind('<Button>', lambda event: self.manager.execute_move(self.pos))
-        elif self.state == "red":
-            self.canvas.create_oval(GAME_PIECE_PADDING, GAME_PIECE_PADDING, 
-                                    GRID_CELL_SIZE - GAME_PIECE_PADDING, GRID_CELL_SIZE - GAME_PIECE_PADDING,
-                                        fill = "black", outline="yellow", width=3)
-            self.canvas.bind('<Button>', lambda event: manager.exit_move())
+            self.canvas.itemconfig(self.dot, state="normal" if highlighted else "hidden")
+        elif highlighted:
+            self.canvas.itemconfig(self.piece, outline="yellow", width=3)
         else:
-            self.canvas.create_oval(GAME_PIECE_PADDING, GAME_PIECE_PADDING, 
-                                    GRID_CELL_SIZE - GAME_PIECE_PADDING, GRID_CELL_SIZE - GAME_PIECE_PADDING,
-                                        fill = "white", outline="yellow", width=3)
-            self.canvas.bind('<Button>', lambda event: manager.exit_move())
-        self.highlighted = True        
-    
-    def unbind_click(self):
-        self.canvas.unbind('<Button>')
+            self.canvas.itemconfig(self.piece, outline="black", width=1)
+        self.highlighted = highlighted
 
 class GameBoard:
+    """
+    Keeps track of which cells are highlighted or clickable so each render
+    step only touches the cells it has to
+    """
     def __init__(self, board, manager, board_size):
         self.display_board = {}
         self.manager = manager
         self.red_score = 0
         self.green_score = 0
         self.turn = "red"
-        col_labels = [chr(ord('a') + num) for num in range(board_size)]
-        
-        for index, label in enumerate(col_labels):
-            tk.Label(tk_root, text=label).grid(row=0, column=index + 1)
-        for index in range(board_size):
-            tk.Label(tk_root, text=index + 1).grid(row=index + 1, column=0)
+        self.pieces = {"red": set(), "green": set()}
+        self.highlighted = set()
+        self.clickable = set()
+        self.draw_labels(board_size)
         for cell, state in board.items():
             row, col = cell
-            self.display_board[cell] = GameCell(row, col, self, self.manager)
+            self.display_board[cell] = self.make_cell(row, col)
+            self.place(cell, state)
             if state == 'red':
-                self.display_board[cell].set_red_state()
                 self.display_board[cell].set_red_goal()
-                self.display_board[cell].make_moveable()
             elif state == 'green':
-                self.display_board[cell].set_green_state()
                 self.display_board[cell].set_green_goal()
+        self.set_clickable(self.pieces[self.turn], "start")
+
+    def draw_labels(self, board_size):
+        col_labels = [chr(ord('a') + num) for num in range(board_size)]
+        
+        for index, label in enumerate(col_labels):
+            tk.Label(self.manager.root, text=label).grid(row=0, column=index + 1)
+        for index in range(board_size):
+            tk.Label(self.manager.root, text=index + 1).grid(row=index + 1, column=0)
+
+    def make_cell(self, row, col):
+        return GameCell(row, col, self, self.manager)
+
+    def place(self, cell, state):
+        display_cell = self.display_board[cell]
+        if display_cell.state != "empty":
+            self.pieces[display_cell.state].discard(cell)
+        if state != "empty":
+            self.pieces[state].add(cell)
+        display_cell.set_state(state)
+
+    def set_clickable(self, cells, action):
+        """Make exactly cells respond to clicks with action, leaving every other cell inert"""
+        cells = set(cells)
+        for cell in self.clickable - cells:
+            self.display_board[cell].set_action(None)
+        for cell in cells:
+            self.display_board[cell].set_action(action)
+        self.clickable = cells
+
+    def set_highlighted(self, cells):
+        cells = set(cells)
+        for cell in self.highlighted - cells:
+            self.display_board[cell].set_highlight(False)
+        for cell in cells - self.highlighted:
+            self.display_board[cell].set_highlight(True)
+        self.highlighted = cells
     
     def exit_move_state(self, turn):
-        for cell in self.display_board.values():
-            state = cell.state
-            if cell.highlighted:
-                cell.highlighted = False
-                cell.clear()
-            if state == "red":
-                cell.set_red_state()
-                if turn == "red":
-                    cell.make_moveable()
-                else:
-                    cell.unbind_click()
-            elif state == "green":
-                cell.set_green_state()
-                if turn == "green":
-                    cell.make_moveable()
-                else:
-                    cell.unbind_click()
+        self.set_highlighted(())
+        self.set_clickable(self.pieces[turn], "start")
     
     def show_moves(self, piece, moves):
-        for cell, canvas in self.display_board.items():
-            if cell in moves or cell == piece:
-                canvas.highlight()
-            else:
-                canvas.unbind_click()
+        self.set_highlighted(set(moves) | {piece})
+        self.set_clickable(moves, "move")
+        self.display_board[piece].set_action("cancel")
+        self.clickable.add(piece)
+
+    def disable(self):
+        self.set_clickable((), None)
     
-    def update(self, new_board):
-        for cell, canvas in self.display_board.items():
-            if new_board[cell] == "empty":
-                canvas.clear()
-            elif new_board[cell] == "red":
-                canvas.set_red_state()
-            else:
-                canvas.set_green_state()
-                
+    def update(self, new_board, changed = None):
+        """Redraw the cells in changed (every cell whose state differs when not given)"""
+        if changed is None:
+            changed = [cell for cell, display_cell in self.display_board.items()
+                       if display_cell.state != new_board[cell]]
+        for cell in changed:
+            self.place(cell, new_board[cell])
 
     def is_goal(self, cell):
         if self.display_board[cell].green_goal:
@@ -340,59 +302,82 @@ class GameBoard:
         else:
             return None
             
-class MoveGenerator:
-    def get_moves(cell, game_board, board_size):
-        move_stack = [[cell, [cell]]]
-        valid_moves = []
-                
-        while move_stack:
-            curr_cell, path = move_stack.pop()
-            row, col = curr_cell
-        
-            for row_change, col_change in MOVE_DIRS:
-                move = (row + row_change, col + col_change)
-                if MoveGenerator.valid_cell(move[0], move[1], board_size) and move not in path:
-                    if game_board[move] == "red" or game_board[move] == "green":
-                        jump_move = (move[0] + row_change, move[1] + col_change)
-                        if MoveGenerator.valid_cell(jump_move[0], jump_move[1], board_size) and game_board[jump_move] == "empty" and jump_move not in path:
-                            valid_moves.append(jump_move)
-                            if MoveGenerator.check_for_surrounding_piece(jump_move, game_board, board_size):
-                                move_stack.append([(jump_move[0], jump_move[1]), path + [jump_move]])
-                    elif curr_cell == cell:
-                        valid_moves.append(move)
-        
-        return valid_moves
-    
-    def manhattan_distance(cell1, cell2):
-        x1, y1 = cell1
-        x2, y2 = cell2
-        return abs(x2 - x1) + abs(y2 - y1)
-
-    def get_closest_goal_distance(cell, goals):
-        closest_val = float('inf')
-        for goal in goals:
-            closest_val = min(closest_val, MoveGenerator.manhattan_distance(cell, goal))
-            
-        return closest_val
-            
 
-    def check_for_surrounding_piece(cell, board, board_size):
-        row, col = cell
-        for row_change, col_change in MOVE_DIRS:
-            adj_cell = (row + row_change, col + col_change)
-            if MoveGenerator.valid_cell(adj_cell[0], adj_cell[1], board_size) and \
-            (board[(adj_cell)] == "red" or board[adj_cell] == "green"):
-                return True
-        return False
+class CanvasCell(GameCell):
+    """A GameCell drawn as a few items on the shared CanvasBoard canvas instead of a widget of its own"""
+    def __init__(self, row, col, game_board, manager):
+        self.pos = (row, col)
+        self.board = game_board
+        self.canvas = game_board.canvas
+        self.state = "empty"
+        self.highlighted = False
+        self.green_goal = False
+        self.red_goal = False
+        self.manager = manager
+        self.action = None
+
+        left = BOARD_MARGIN + col * GRID_CELL_SIZE
+        top = BOARD_MARGIN + row * GRID_CELL_SIZE
+        self.square = self.canvas.create_rectangle(left, top, left + GRID_CELL_SIZE, top + GRID_CELL_SIZE,
+                                                   fill='burlywood1', outline='black')
+        self.piece = self.canvas.create_oval(left + GAME_PIECE_PADDING, top + GAME_PIECE_PADDING, 
+                                             left + GRID_CELL_SIZE - GAME_PIECE_PADDING,
+                                             top + GRID_CELL_SIZE - GAME_PIECE_PADDING,
+                                             state="hidden")
+        dot_size = 10 
+        center_x = left + GRID_CELL_SIZE / 2
+        center_y = top + GRID_CELL_SIZE / 2
+        self.dot = self.canvas.create_oval(center_x - dot_size / 2, center_y - dot_size / 2,
+                                           center_x + dot_size / 2, center_y + dot_size / 2,
+                                           fill="black", state="hidden")
+
+    def set_red_goal(self):
+        self.canvas.itemconfig(self.square, fill="red")
+        self.red_goal = True
         
-    def valid_cell(row, col, board_size):
-        return row < board_size and row > -1 and col < board_size and col > -1
+    def set_green_goal(self):
+        self.canvas.itemconfig(self.square, fill="green")
+        self.green_goal = True
+
+class CanvasBoard(GameBoard):
+    """
+    GameBoard drawn on a single tk.Canvas, so the widget count no longer grows
+    with board_size squared; clicks are mapped to cells by coordinate
+    """
+    def __init__(self, board, manager, board_size):
+        self.board_size = board_size
+        side = BOARD_MARGIN + board_size * GRID_CELL_SIZE
+        self.canvas = tk.Canvas(manager.root, width = side, height = side, highlightthickness = 0)
+        self.canvas.grid(row=0, column=0, rowspan=board_size + 1, columnspan=board_size + 1)
+        self.canvas.bind('<Button>', self.click)
+        super().__init__(board, manager, board_size)
+
+    def draw_labels(self, board_size):
+        for index in range(board_size):
+            center = BOARD_MARGIN + index * GRID_CELL_SIZE + GRID_CELL_SIZE / 2
+            self.canvas.create_text(center, BOARD_MARGIN / 2, text=chr(ord('a') + index))
+            self.canvas.create_text(BOARD_MARGIN / 2, center, text=index + 1)
 
+    def make_cell(self, row, col):
+        return CanvasCell(row, col, self, self.manager)
+
+    def cell_at(self, x, y):
+        row = (y - BOARD_MARGIN) // GRID_CELL_SIZE
+        col = (x - BOARD_MARGIN) // GRID_CELL_SIZE
+        if x < BOARD_MARGIN or y < BOARD_MARGIN or row >= self.board_size or col >= self.board_size:
+            return None
+        return (row, col)
 
+    def click(self, event):
+        cell = self.cell_at(event.x, event.y)
+        if cell is not None:
+            self.display_board[cell].click(event)
 
+RENDERERS = {"cells": GameBoard, "canvas": CanvasBoard}
 
-tk_root = tk.Tk()
+if __name__ == "__main__":
+    root = tk.Tk()
 
-tk_root.title("Halma")
-manager = GameManager(8)
-tk_root.mainloop()
+    root.title("Halma")
+    manager = GameManager(root, 8, ai_color="green", ai_search_depth=3, pruning=True)
+    root.mainloop()
@@ -17,7 +17,13 @@ def run_file(filename):
     fc.interact(banner="", exitmsg="")
 
 if __name__ == "__main__":
+    import os
     import sys
+    from replay import GAME_RECORD_SUFFIX
+    # game records (or directories of them) are checked by the replayer instead of run as scripts
+    if os.path.isdir(sys.argv[1]) or sys.argv[1].endswith(GAME_RECORD_SUFFIX):
+        from replay import main
+        sys.exit(main(sys.argv[1:]))
     sys.ps1 = "\n>>> "
     run_file(sys.argv[1])
 
@@ -0,0 +1,53 @@
+from geometry import get_geometry
+
+TT_MOVE_SCORE = 1 << 40
+FORWARD_JUMP_SCORE = 1 << 30
+KILLER_SCORE = 1 << 20
+
+class MoveOrderer:
+    """
+    Sorts moves so alpha-beta sees the likely best ones first:
+        1. the transposition table / principal variation move
+        2. jumps that bring the piece closer to its goal camp, longest first
+        3. killer moves (caused a cutoff at the same ply elsewhere in the tree)
+        4. everything else by history score (how often the move caused cutoffs)
+
+    goal_distances maps a color to a per-square list of distance to that color's goal camp
+    """
+    def __init__(self, board_size, goal_distances, killers_per_ply = 2):
+        self.geometry = get_geometry(board_size)
+        self.goal_distances = goal_distances
+        self.killers_per_ply = killers_per_ply
+        self.killers = {}
+        self.history = {}
+
+    def new_search(self):
+        self.killers = {}
+        # keep some memory of earlier searches but let new cutoffs dominate
+        self.history = {move: score // 2 for move, score in self.history.items() if score > 1}
+
+    def order(self, moves, color, tt_move = None, ply = 0):
+        distances = self.goal_distances[color]
+        neighbor_masks = self.geometry.neighbor_masks
+        killers = self.killers.get(ply, ())
+        history = self.history
+
+        def score(move):
+            if move == tt_move:
+                return TT_MOVE_SCORE
+            from_index, to_index = move
+            progress = distances[from_index] - distances[to_index]
+            if progress > 0 and not neighbor_masks[from_index] >> to_index & 1:
+                return FORWARD_JUMP_SCORE + progress
+            if move in killers:
+                return KILLER_SCORE
+            return min(history.get(move, 0), KILLER_SCORE - 1)
+
+        return sorted(moves, key=score, reverse=True)
+
+    def record_cutoff(self, move, ply, depth_left):
+        killers = self.killers.setdefault(ply, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[self.killers_per_ply:]
+        self.history[move] = self.history.get(move, 0) + depth_left * depth_left
@@ -0,0 +1,95 @@
+import sys
+from collections import OrderedDict
+
+# rough per-entry cost of the OrderedDict itself (hash slot plus linked-list node)
+ENTRY_OVERHEAD = 100
+# the (square, reach, occupancy) key tuple
+KEY_OVERHEAD = sys.getsizeof((0, 0, 0))
+
+class MoveCache:
+    """
+    LRU cache of move masks, bounded by an estimate of its memory use
+
+    A piece's moves depend only on the occupancy of its reach: the squares
+    Bitboard.get_move_mask_with_reach looked at. Entries are keyed by
+    (square, reach, occupancy & reach), so any position that agrees with the
+    cached one on those squares reuses the result. Each square remembers its
+    masks_per_square most recently used reach masks to try on lookup
+
+    Keys only describe occupancy, so one cache can be shared by every
+    position of a given board size
+    """
+    def __init__(self, max_bytes = 16 << 20, masks_per_square = 4):
+        self.max_bytes = max_bytes
+        self.masks_per_square = masks_per_square
+        self.entries = OrderedDict()
+        self.reaches = {}
+        # every entry is charged as if its masks covered the whole board; set on first use
+        self.entry_bytes = None
+        self.max_entries = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, position, index):
+        """Move mask of the piece on index, computed by position on a miss"""
+        occupied = position.red | position.green
+        entries = self.entries
+        reaches = self.reaches.get(index)
+        if reaches:
+            for reach in reaches:
+                key = (index, reach, occupied & reach)
+                move_mask = entries.get(key)
+                if move_mask is not None:
+                    entries.move_to_end(key)
+                    if reaches[0] != reach:
+                        reaches.remove(reach)
+                        reaches.insert(0, reach)
+                    self.hits += 1
+                    return move_mask
+        else:
+            reaches = self.reaches[index] = []
+            if self.max_entries is None:
+                self.size_entries(position.geometry.num_cells)
+
+        self.misses += 1
+        move_mask, reach = position.get_move_mask_with_reach(index)
+        entries[(index, reach, occupied & reach)] = move_mask
+        if reach in reaches:
+            reaches.remove(reach)
+        reaches.insert(0, reach)
+        del reaches[self.masks_per_square:]
+        if len(entries) > self.max_entries:
+            entries.popitem(last=False)
+            self.evictions += 1
+        return move_mask
+
+    def size_entries(self, num_cells):
+        full_mask = (1 << num_cells) - 1
+        self.entry_bytes = ENTRY_OVERHEAD + KEY_OVERHEAD + sys.getsizeof(num_cells) + 3 * sys.getsizeof(full_mask)
+        self.max_entries = max(1, self.max_bytes // self.entry_bytes)
+
+    @property
+    def bytes(self):
+        return len(self.entries) * (self.entry_bytes or 0)
+
+    def clear(self):
+        self.entries.clear()
+        self.reaches.clear()
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hit_rate(),
+        }
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,103 @@
+import argparse
+import json
+import random
+import struct
+import sys
+import time
+from multiprocessing import Pool
+from bitboard import Bitboard
+from record_file import RecordFile, write_records
+
+BOOK_MAGIC = b"HLMB"
+BOOK_MOVE = struct.Struct("<HH")
+SIDE_TO_MOVE = {"red": b"\x00", "green": b"\x01"}
+
+_books = {}
+
+def book_key(position, color):
+    return position.to_bytes() + SIDE_TO_MOVE[color]
+
+class OpeningBook:
+    """
+    Memory-mapped table of position -> book move, keyed by Bitboard.to_bytes()
+    plus a side-to-move byte. Only the pages a lookup touches are read
+    """
+    def __init__(self, path):
+        self.records = RecordFile(path, BOOK_MAGIC)
+
+    def lookup(self, position, color):
+        """(from_index, to_index) for color in position, or None when the book has no entry"""
+        value = self.records.get(book_key(position, color))
+        if value is None:
+            return None
+        return BOOK_MOVE.unpack(value)
+
+    def __len__(self):
+        return len(self.records)
+
+def open_book(path):
+    """Open a book once per process and share it between engines"""
+    book = _books.get(path)
+    if book is None:
+        book = _books[path] = OpeningBook(path)
+    return book
+
+def book_game(board_size, config, plies, seed, random_plies):
+    """
+    Play the first plies of one self-play game and return the book entries
+    seen on the way: every position visited gets the searching engine's move,
+    while the first random_plies moves are random so games branch out
+    """
+    # imported here because engine imports this module for open_book
+    from engine import HalmaEngine
+    rng = random.Random(seed)
+    game = HalmaEngine(board_size)
+    player = HalmaEngine(board_size, **config)
+    entries = []
+    for ply in range(plies):
+        if game.winner() is not None:
+            break
+        position = game.position()
+        ai_move = player.get_ai_move(position, game.turn)
+        if ai_move is None:
+            break
+        index = position.geometry.index
+        entries.append((book_key(position, game.turn), BOOK_MOVE.pack(index(ai_move[0]), index(ai_move[1]))))
+        game.play_move(*(rng.choice(game.legal_moves()) if ply < random_plies else ai_move))
+    player.close()
+    return entries
+
+def _book_game(args):
+    return book_game(*args)
+
+def build_book(path, board_size, config, games, plies, seed = 0, random_plies = 2, processes = None):
+    jobs = [(board_size, config, plies, seed + game, random_plies) for game in range(games)]
+    records = {}
+    with Pool(processes) as pool:
+        for entries in pool.imap_unordered(_book_game, jobs):
+            for key, move in entries:
+                records.setdefault(key, move)
+    key_size = 1 + 2 * Bitboard.mask_bytes(board_size) + len(SIDE_TO_MOVE["red"])
+    write_records(path, BOOK_MAGIC, records, key_size, BOOK_MOVE.size)
+    return len(records)
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Build an opening book from self-play")
+    parser.add_argument("output")
+    parser.add_argument("--board-size", type=int, default=8)
+    parser.add_argument("--config", default='{"ai_search_depth": 3, "pruning": true}',
+                        help="HalmaEngine keyword arguments for the engine choosing book moves, as JSON")
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--plies", type=int, default=12, help="how deep into each game to record positions")
+    parser.add_argument("--random-plies", type=int, default=2, help="random moves at the start of each game")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    count = build_book(args.output, args.board_size, json.loads(args.config), args.games, args.plies,
+                       args.seed, args.random_plies, args.processes)
+    print(f"wrote {count} positions to {args.output} in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import argparse
+import sys
+import time
+from engine import HalmaEngine, MoveGenerator
+from geometry import cell_name, iter_bits, parse_cell
+
+def reference_moves(position, color):
+    """Moves as the original MoveGenerator.get_moves finds them, duplicates removed"""
+    board = position.to_dict()
+    index = position.geometry.index
+    moves = []
+    for from_index in iter_bits(position.pieces(color)):
+        cell = position.geometry.cells[from_index]
+        for dest in dict.fromkeys(MoveGenerator.get_moves(cell, board, position.board_size)):
+            moves.append((from_index, index(dest)))
+    return moves
+
+def reachable_moves(position, color):
+    board = position.to_dict()
+    index = position.geometry.index
+    moves = []
+    for from_index in iter_bits(position.pieces(color)):
+        cell = position.geometry.cells[from_index]
+        for dest in MoveGenerator.get_reachable(cell, board, position.board_size):
+            moves.append((from_index, index(dest)))
+    return moves
+
+def bitboard_moves(position, color):
+    return list(position.generate_moves(color))
+
+GENERATORS = {
+    "reference": reference_moves,
+    "reachable": reachable_moves,
+    "bitboard": bitboard_moves,
+}
+
+def other(color):
+    return "green" if color == "red" else "red"
+
+def perft(position, depth, color, generator):
+    """Number of move sequences of length depth from position, red and green alternating"""
+    if depth == 0:
+        return 1
+    moves = generator(position, color)
+    if depth == 1:
+        return len(moves)
+    total = 0
+    for move in moves:
+        position.make_move(*move)
+        total += perft(position, depth - 1, other(color), generator)
+        position.unmake_move()
+    return total
+
+def format_position(position):
+    symbols = {"red": "R", "green": "G", "empty": "."}
+    size = position.board_size
+    lines = ["   " + " ".join(chr(ord('a') + col) for col in range(size))]
+    for row in range(size):
+        states = [symbols[position.state_at(row * size + col)] for col in range(size)]
+        lines.append(f"{row + 1:>2} " + " ".join(states))
+    return "\n".join(lines)
+
+def format_move(position, move):
+    cells = position.geometry.cells
+    return f"{cell_name(cells[move[0]])}-{cell_name(cells[move[1]])}"
+
+def find_mismatch(position, depth, color, generator_a, generator_b, line = ()):
+    """
+    Walk the tree comparing the two generators' move sets at every node
+
+    Returns None when they agree everywhere, otherwise (moves leading to the
+    diverging position, side to move, moves only in a, moves only in b)
+    """
+    if depth == 0:
+        return None
+    moves_a = generator_a(position, color)
+    moves_b = generator_b(position, color)
+    if set(moves_a) != set(moves_b):
+        return line, color, set(moves_a) - set(moves_b), set(moves_b) - set(moves_a)
+    for move in moves_a:
+        position.make_move(*move)
+        mismatch = find_mismatch(position, depth - 1, other(color), generator_a, generator_b,
+                                 line + (format_move(position, move),))
+        position.unmake_move()
+        if mismatch is not None:
+            return mismatch
+    return None
+
+def starting_position(board_size, moves):
+    game = HalmaEngine(board_size)
+    for move in moves:
+        try:
+            from_name, to_name = move.split("-")
+            from_cell, to_cell = parse_cell(from_name), parse_cell(to_name)
+        except (ValueError, IndexError):
+            raise ValueError(f"bad move {move!r}, expected e.g. a3-a5")
+        if from_cell not in game.board or to_cell not in game.board or not game.is_legal_move(from_cell, to_cell):
+            raise ValueError(f"illegal move {move}")
+        game.play_move(from_cell, to_cell)
+    return game.position(), game.turn
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Count move sequences to a fixed depth and cross-check move generators")
+    parser.add_argument("--board-size", type=int, default=8)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--moves", nargs="*", default=[], help="moves from the opening, e.g. a3-a5 h6-h4")
+    parser.add_argument("--generator", choices=sorted(GENERATORS), default="bitboard")
+    parser.add_argument("--compare", nargs=2, choices=sorted(GENERATORS), metavar=("A", "B"),
+                        help="check that two generators agree on every node of the tree")
+    args = parser.parse_args(argv)
+
+    try:
+        position, color = starting_position(args.board_size, args.moves)
+    except ValueError as error:
+        parser.error(str(error))
+
+    if args.compare:
+        generator_a, generator_b = (GENERATORS[name] for name in args.compare)
+        mismatch = find_mismatch(position, args.depth, color, generator_a, generator_b)
+        if mismatch is not None:
+            line, side, only_a, only_b = mismatch
+            for move in line:
+                from_cell, to_cell = (parse_cell(name) for name in move.split("-"))
+                position.make_move(position.geometry.index(from_cell), position.geometry.index(to_cell))
+            print(f"generators disagree after: {' '.join(line) or '(start)'} ({side} to move)")
+            print(format_position(position))
+            print(f"only {args.compare[0]}: {sorted(format_move(position, move) for move in only_a)}")
+            print(f"only {args.compare[1]}: {sorted(format_move(position, move) for move in only_b)}")
+            return 1
+        print(f"{args.compare[0]} and {args.compare[1]} agree to depth {args.depth}")
+        names = args.compare
+    else:
+        names = [args.generator]
+
+    for name in names:
+        start = time.perf_counter()
+        count = perft(position, args.depth, color, GENERATORS[name])
+        elapsed = time.perf_counter() - start
+        rate = count / elapsed if elapsed else 0.0
+        print(f"{name}: perft({args.depth}) = {count} in {elapsed:.3f}s ({rate:,.0f} leaves/sec)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
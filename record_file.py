@@ -0,0 +1,58 @@
+import mmap
+import struct
+
+# magic, key size, value size, record count
+HEADER = struct.Struct("<4sHHI")
+
+def write_records(path, magic, records, key_size, value_size):
+    """
+    Write {key bytes: value bytes} as a sorted table of fixed-size records
+
+    Every key must be key_size bytes and every value value_size bytes, so
+    RecordFile can binary search the file in place without loading it
+    """
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(magic, key_size, value_size, len(records)))
+        for key in sorted(records):
+            value = records[key]
+            if len(key) != key_size or len(value) != value_size:
+                raise ValueError(f"record size mismatch: {len(key)}/{len(value)} bytes")
+            f.write(key)
+            f.write(value)
+
+class RecordFile:
+    """Read-only, memory-mapped view of a file written by write_records"""
+    def __init__(self, path, magic):
+        self.path = path
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        file_magic, self.key_size, self.value_size, self.count = HEADER.unpack_from(self.data, 0)
+        if file_magic != magic:
+            self.close()
+            raise ValueError(f"{path} is not a {magic.decode()} file")
+        self.record_size = self.key_size + self.value_size
+
+    def key_at(self, record):
+        offset = HEADER.size + record * self.record_size
+        return self.data[offset:offset + self.key_size]
+
+    def get(self, key):
+        low = 0
+        high = self.count
+        while low < high:
+            mid = (low + high) // 2
+            if self.key_at(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self.count and self.key_at(low) == key:
+            offset = HEADER.size + low * self.record_size + self.key_size
+            return self.data[offset:offset + self.value_size]
+        return None
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self.data.close()
+        self.file.close()
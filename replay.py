@@ -0,0 +1,174 @@
+import argparse
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+from engine import HalmaEngine
+from geometry import cell_name, parse_cell
+
+GAME_RECORD_SUFFIX = ".hgr"
+
+def write_game(f, board_size, moves, winner, red_score, green_score):
+    """
+    Append one game in the record format:
+
+        size 8
+        b2-c3
+        h7-f5
+        ...
+        result red 10 4
+
+    moves are (from_cell, to_cell) pairs; winner is "red", "green" or None
+    (written as "none"). Blank lines and lines starting with # are ignored
+    """
+    f.write(f"size {board_size}\n")
+    for from_cell, to_cell in moves:
+        f.write(f"{cell_name(from_cell)}-{cell_name(to_cell)}\n")
+    f.write(f"result {winner or 'none'} {red_score} {green_score}\n")
+
+class ReplayError(Exception):
+    pass
+
+class GameReplay:
+    """Plays one recorded game forward, checking every move as it comes"""
+    def __init__(self, board_size):
+        self.game = HalmaEngine(board_size, tt_size=0)
+        self.position = self.game.position()
+        self.index = self.position.geometry.index
+        self.moves = 0
+
+    def play(self, text):
+        try:
+            from_name, to_name = text.split("-")
+            from_cell, to_cell = parse_cell(from_name), parse_cell(to_name)
+        except ValueError:
+            raise ReplayError("not a move")
+        game = self.game
+        if from_cell not in game.board or to_cell not in game.board:
+            raise ReplayError("off the board")
+        if game.winner() is not None:
+            raise ReplayError(f"game already won by {game.winner()}")
+        from_index, to_index = self.index(from_cell), self.index(to_cell)
+        if not self.position.pieces(game.turn) >> from_index & 1:
+            raise ReplayError(f"no {game.turn} piece on {from_name}")
+        if not self.position.get_move_mask(from_index) >> to_index & 1:
+            raise ReplayError("illegal move")
+        self.position.make_move(from_index, to_index)
+        game.play_move(from_cell, to_cell)
+        self.moves += 1
+
+    def check_result(self, text):
+        game = self.game
+        try:
+            winner, red_score, green_score = text.split()
+            expected = (None if winner == "none" else winner, int(red_score), int(green_score))
+        except ValueError:
+            raise ReplayError("bad result line")
+        actual = (game.winner(), game.red_score, game.green_score)
+        if actual != expected:
+            raise ReplayError(f"result is {actual[0] or 'none'} {actual[1]} {actual[2]}, "
+                              f"record says {winner} {red_score} {green_score}")
+
+def replay_file(path):
+    """
+    Replay every game in a record file; returns a summary with the number of
+    games and moves checked and the first error found, if any. A game stops
+    being checked at its first error but later games in the file still are.
+    Every game must start with its size line and end with its result line,
+    with nothing in between games
+    """
+    games = 0
+    moves = 0
+    bad_games = 0
+    first_error = None
+    replay = None
+    # set between a game's result line and the next size line
+    finished = False
+    # set from a game's first error to the next size line; its remaining lines are skipped
+    failed = False
+    line_number = 0
+
+    def fail(line_number, text, error):
+        nonlocal bad_games, first_error, moves, replay, failed
+        bad_games += 1
+        if first_error is None:
+            first_error = {"game": games, "line": line_number, "ply": replay.moves + 1 if replay else 0,
+                           "text": text, "error": str(error)}
+        if replay is not None:
+            moves += replay.moves
+        replay = None
+        failed = True
+
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("size"):
+                if replay is not None:
+                    fail(line_number, line, ReplayError("missing result"))
+                games += 1
+                finished = failed = False
+                try:
+                    replay = GameReplay(int(line.split()[1]))
+                except (IndexError, ValueError):
+                    fail(line_number, line, ReplayError("bad size line"))
+                continue
+            try:
+                if finished:
+                    finished = False
+                    raise ReplayError("line after result")
+                if failed:
+                    continue
+                if replay is None:
+                    raise ReplayError("move before size line")
+                if line.startswith("result"):
+                    replay.check_result(line[len("result"):])
+                    moves += replay.moves
+                    replay = None
+                    finished = True
+                else:
+                    replay.play(line)
+            except ReplayError as error:
+                fail(line_number, line, error)
+    if replay is not None:
+        fail(line_number, "", ReplayError("missing result"))
+    return {"file": path, "games": games, "moves": moves, "bad_games": bad_games, "first_error": first_error}
+
+def record_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(GAME_RECORD_SUFFIX):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+def replay_all(paths, processes = None, out = sys.stdout):
+    """Replay files in parallel, writing each file's summary as a JSON line as soon as it is done"""
+    totals = {"files": 0, "games": 0, "moves": 0, "bad_files": 0}
+    with Pool(processes) as pool:
+        for result in pool.imap_unordered(replay_file, record_files(paths), chunksize=4):
+            out.write(json.dumps(result) + "\n")
+            totals["files"] += 1
+            totals["games"] += result["games"]
+            totals["moves"] += result["moves"]
+            totals["bad_files"] += result["first_error"] is not None
+    return totals
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Check recorded Halma games move by move")
+    parser.add_argument("paths", nargs="+", help=f"{GAME_RECORD_SUFFIX} files or directories of them")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: one per core)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    totals = replay_all(args.paths, args.processes)
+    elapsed = time.perf_counter() - start
+    print(f"{totals['games']} games ({totals['moves']} moves) in {totals['files']} files, {elapsed:.2f}s: "
+          f"{totals['games'] / elapsed:.1f} games/s, {totals['bad_files']} files with errors", file=sys.stderr)
+    return 1 if totals["bad_files"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
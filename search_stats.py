@@ -0,0 +1,64 @@
+import json
+import time
+
+class SearchStats:
+    """
+    Counters for one AI move, filled in by HalmaEngine.search when collect_stats is on
+
+    Depths count plies from the root (0 is the position being searched)
+    """
+    def __init__(self, color = None):
+        self.color = color
+        self.depth_reached = 0
+        self.nodes_per_depth = {}
+        self.cutoffs_per_depth = {}
+        self.leaf_evals = 0
+        self.interior_nodes = 0
+        self.children_searched = 0
+        self.worker_nodes = 0
+        self.movegen_time = 0.0
+        self.eval_time = 0.0
+        self.start_time = time.perf_counter()
+        self.elapsed = 0.0
+
+    def visit(self, depth):
+        self.nodes_per_depth[depth] = self.nodes_per_depth.get(depth, 0) + 1
+
+    def cutoff(self, depth):
+        self.cutoffs_per_depth[depth] = self.cutoffs_per_depth.get(depth, 0) + 1
+
+    def finish(self, depth_reached):
+        self.depth_reached = depth_reached
+        self.elapsed = time.perf_counter() - self.start_time
+
+    @property
+    def nodes(self):
+        return sum(self.nodes_per_depth.values()) + self.worker_nodes
+
+    @property
+    def branching_factor(self):
+        return self.children_searched / self.interior_nodes if self.interior_nodes else 0.0
+
+    @property
+    def nodes_per_second(self):
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+    def to_dict(self):
+        return {
+            "color": self.color,
+            "depth_reached": self.depth_reached,
+            "nodes": self.nodes,
+            "nodes_per_depth": self.nodes_per_depth,
+            "cutoffs_per_depth": self.cutoffs_per_depth,
+            "leaf_evals": self.leaf_evals,
+            "branching_factor": self.branching_factor,
+            "movegen_time": self.movegen_time,
+            "eval_time": self.eval_time,
+            "elapsed": self.elapsed,
+            "nodes_per_second": self.nodes_per_second,
+        }
+
+    def write_json(self, path):
+        """Append this move's stats as one JSON line"""
+        with open(path, "a") as f:
+            f.write(json.dumps(self.to_dict()) + "\n")
@@ -0,0 +1,367 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from bitboard import Bitboard
+from engine import HalmaEngine, worker_engine
+from geometry import cell_name, parse_cell
+
+MAX_BOARD_SIZE = 16
+MAX_SEARCH_DEPTH = 4
+MAX_TIME_LIMIT = 10.0
+# seconds per AI move when the client doesn't pick a time_limit; every search has one
+DEFAULT_TIME_LIMIT = 2.0
+MAX_TT_SIZE = 1 << 20
+# the HalmaEngine settings a client may choose for an AI player: (type, lowest, highest).
+# Anything touching files or processes is server configuration instead
+AI_SETTINGS = {
+    "ai_search_depth": (int, 0, MAX_SEARCH_DEPTH),
+    "pruning": (bool, None, None),
+    "pvs": (bool, None, None),
+    "move_ordering": (bool, None, None),
+    "tt_size": (int, 0, MAX_TT_SIZE),
+    "time_limit": (float, 0, MAX_TIME_LIMIT),
+}
+
+def search_position(board_size, settings, red, green, color):
+    """Run in a pool worker: the AI move for color in the position given by the red / green masks"""
+    return worker_engine(board_size, settings).get_ai_move(Bitboard(board_size, red, green), color)
+
+class ServerGame:
+    """
+    One game held by the server: the rules engine plus, per color, the
+    HalmaEngine settings its AI searches with (None for a human player)
+    """
+    def __init__(self, game_id, board_size, players):
+        self.game_id = game_id
+        # rules and bookkeeping only; searches happen on the pool
+        self.engine = HalmaEngine(board_size, tt_size=0)
+        self.players = players
+        self.moves = 0
+        # one request at a time per game, in the order they arrived
+        self.lock = asyncio.Lock()
+
+    def state(self):
+        engine = self.engine
+        return {
+            "game": self.game_id,
+            "turn": engine.turn,
+            "winner": engine.winner(),
+            "moves": self.moves,
+            "red_score": engine.red_score,
+            "green_score": engine.green_score,
+            "red_to_win": engine.red_to_win,
+            "green_to_win": engine.green_to_win,
+        }
+
+    def play(self, from_cell, to_cell):
+        self.engine.play_move(from_cell, to_cell)
+        self.moves += 1
+
+class RequestError(Exception):
+    pass
+
+class GameServer:
+    """
+    Many independent games behind one JSON Lines protocol
+
+    Every request is an object with an "op" and usually a "game"; the reply
+    echoes the request's "id". Ops:
+        new    {"board_size": 8, "ai": {"green": {engine settings}}}
+        move   {"game": 1, "from": "b2", "to": "c3"}   (the AI replies if it is its turn)
+        ai     {"game": 1}                             (the side to move's AI plays)
+        moves  {"game": 1}
+        state  {"game": 1}
+        close  {"game": 1}
+
+    Clients may only pick the AI settings in AI_SETTINGS. engine_settings
+    (e.g. opening_book, endgame_table) come from whoever runs the server and
+    are applied on top of every AI player's settings. Every search runs under
+    a time_limit: the client's, or time_limit when it gave none
+
+    AI searches run on a process pool; at most max_searches are queued or
+    running at once and further AI requests wait for a slot
+    """
+    def __init__(self, processes = None, max_searches = None, engine_settings = None,
+                 time_limit = DEFAULT_TIME_LIMIT):
+        self.games = {}
+        self.engine_settings = engine_settings or {}
+        self.time_limit = time_limit
+        self.next_game = 0
+        processes = processes or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(processes)
+        self.search_slots = asyncio.Semaphore(max_searches or 2 * processes)
+
+    async def handle(self, request):
+        try:
+            op = request.get("op")
+            handler = getattr(self, f"op_{op}", None) if isinstance(op, str) else None
+            if handler is None:
+                raise RequestError(f"unknown op {op!r}")
+            reply = await handler(request)
+            reply["ok"] = True
+        except RequestError as error:
+            reply = {"ok": False, "error": str(error)}
+        except Exception as error:
+            # keep serving the other games
+            reply = {"ok": False, "error": f"internal error: {error!r}"}
+        if "id" in request:
+            reply["id"] = request["id"]
+        return reply
+
+    def game(self, request):
+        game = self.games.get(request.get("game"))
+        if game is None:
+            raise RequestError(f"no game {request.get('game')!r}")
+        return game
+
+    def cell(self, game, name):
+        try:
+            cell = parse_cell(name)
+        except (TypeError, ValueError, IndexError):
+            raise RequestError(f"bad cell {name!r}")
+        if cell not in game.engine.board:
+            raise RequestError(f"bad cell {name!r}")
+        return cell
+
+    def check_settings(self, settings):
+        if not isinstance(settings, dict):
+            raise RequestError(f"bad AI settings {settings!r}")
+        for name, value in settings.items():
+            if name not in AI_SETTINGS:
+                raise RequestError(f"AI setting {name!r} is not allowed")
+            kind, lowest, highest = AI_SETTINGS[name]
+            if kind is float:
+                valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+            else:
+                valid = type(value) is kind
+            if not valid or (lowest is not None and not lowest <= value <= highest):
+                raise RequestError(f"bad {name} {value!r}")
+
+    async def op_new(self, request):
+        board_size = request.get("board_size", 8)
+        if type(board_size) is not int or not 4 <= board_size <= MAX_BOARD_SIZE:
+            raise RequestError(f"bad board_size {board_size!r}")
+        ai = request.get("ai", {})
+        if not isinstance(ai, dict) or not set(ai) <= {"red", "green"}:
+            raise RequestError(f"bad ai {ai!r}")
+        players = {color: ai.get(color) for color in ("red", "green")}
+        for settings in players.values():
+            if settings is not None:
+                self.check_settings(settings)
+        self.next_game += 1
+        game = self.games[self.next_game] = ServerGame(self.next_game, board_size, players)
+        reply = game.state()
+        if game.players[game.engine.turn] is not None:
+            async with game.lock:
+                reply["reply"] = await self.play_ai(game)
+            reply.update(game.state())
+        return reply
+
+    async def op_move(self, request):
+        game = self.game(request)
+        async with game.lock:
+            engine = game.engine
+            if engine.winner() is not None:
+                raise RequestError("game is over")
+            if game.players[engine.turn] is not None:
+                raise RequestError(f"{engine.turn} is played by the AI")
+            from_cell = self.cell(game, request.get("from"))
+            to_cell = self.cell(game, request.get("to"))
+            if not engine.is_legal_move(from_cell, to_cell):
+                raise RequestError("illegal move")
+            game.play(from_cell, to_cell)
+            reply = {}
+            if engine.winner() is None and game.players[engine.turn] is not None:
+                reply["reply"] = await self.play_ai(game)
+            reply.update(game.state())
+            return reply
+
+    async def op_ai(self, request):
+        game = self.game(request)
+        async with game.lock:
+            if game.engine.winner() is not None:
+                raise RequestError("game is over")
+            settings = request.get("settings")
+            if settings is not None:
+                self.check_settings(settings)
+            reply = {"move": await self.play_ai(game, settings)}
+            reply.update(game.state())
+            return reply
+
+    async def op_moves(self, request):
+        game = self.game(request)
+        async with game.lock:
+            return {"game": game.game_id, "moves": [[cell_name(from_cell), cell_name(to_cell)]
+                                                    for from_cell, to_cell in game.engine.legal_moves()]}
+
+    async def op_state(self, request):
+        game = self.game(request)
+        async with game.lock:
+            reply = game.state()
+            for color in ("red", "green"):
+                reply[color] = [cell_name(cell) for cell, state in game.engine.board.items() if state == color]
+            return reply
+
+    async def op_close(self, request):
+        game = self.game(request)
+        del self.games[game.game_id]
+        return {"game": game.game_id}
+
+    async def play_ai(self, game, settings = None):
+        """Search the side to move's reply on the pool and play it; returns the move as cell names"""
+        engine = game.engine
+        color = engine.turn
+        if settings is None:
+            settings = game.players[color] or {}
+        settings = dict(settings, **self.engine_settings)
+        # without a deadline an allowed depth can still take hours on a big board
+        settings["time_limit"] = settings.get("time_limit") or self.time_limit
+        position = engine.position()
+        async with self.search_slots:
+            move = await asyncio.get_running_loop().run_in_executor(
+                self.pool, search_position, engine.board_size, settings, position.red, position.green, color)
+        if move is None:
+            raise RequestError(f"{color} has no moves")
+        game.play(*move)
+        return [cell_name(move[0]), cell_name(move[1])]
+
+    async def serve(self, reader, write, max_inflight = 64):
+        """
+        Answer requests from one connection, several at a time; once max_inflight
+        are unanswered this stops reading, so a fast client is slowed to the
+        server's pace instead of queueing without bound
+        """
+        inflight = asyncio.Semaphore(max_inflight)
+        tasks = set()
+
+        async def answer(line):
+            try:
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request must be an object")
+                except ValueError as error:
+                    reply = {"ok": False, "error": f"bad request: {error}"}
+                else:
+                    reply = await self.handle(request)
+                await write(json.dumps(reply) + "\n")
+            finally:
+                inflight.release()
+
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if not line.strip():
+                continue
+            await inflight.acquire()
+            task = asyncio.create_task(answer(line))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.wait(tasks)
+
+    async def serve_socket(self, host, port):
+        async def connection(reader, writer):
+            async def write(text):
+                writer.write(text.encode())
+                await writer.drain()
+            await self.serve(reader, write)
+            writer.close()
+
+        server = await asyncio.start_server(connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def serve_stdio(self):
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+        async def write(text):
+            sys.stdout.write(text)
+            sys.stdout.flush()
+        await self.serve(reader, write)
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+async def load_test(server, games, concurrency, board_size, settings, max_moves):
+    """
+    Play games AI vs AI through server.handle, concurrency at a time, and
+    report games/sec and per-move latency (request to reply, including any
+    wait for a search slot)
+    """
+    latencies = []
+    finished = 0
+    slots = asyncio.Semaphore(concurrency)
+
+    async def play(game_number):
+        nonlocal finished
+        async with slots:
+            reply = await server.handle({"op": "new", "board_size": board_size,
+                                         "ai": {"red": settings, "green": settings}})
+            game_id = reply["game"]
+            while reply.get("ok") and reply["winner"] is None and reply["moves"] < max_moves:
+                start = time.perf_counter()
+                reply = await server.handle({"op": "ai", "game": game_id})
+                latencies.append(time.perf_counter() - start)
+            await server.handle({"op": "close", "game": game_id})
+            finished += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(play(game_number) for game_number in range(games)))
+    elapsed = time.perf_counter() - start
+    return {
+        "games": finished,
+        "moves": len(latencies),
+        "seconds": elapsed,
+        "games_per_sec": finished / elapsed,
+        "moves_per_sec": len(latencies) / elapsed,
+        "p50_move_latency": percentile(latencies, 0.50),
+        "p99_move_latency": percentile(latencies, 0.99),
+    }
+
+async def run(args):
+    server = GameServer(args.processes, args.max_searches, json.loads(args.engine), args.time_limit)
+    try:
+        if args.load_test:
+            results = await load_test(server, args.load_test, args.concurrency, args.board_size,
+                                      json.loads(args.ai), args.max_moves)
+            print(json.dumps(results, indent=2))
+        elif args.port is not None:
+            await server.serve_socket(args.host, args.port)
+        else:
+            await server.serve_stdio()
+    finally:
+        server.close()
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Serve many Halma games over a JSON Lines protocol")
+    parser.add_argument("--port", type=int, help="listen on this TCP port (default: talk over stdin/stdout)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--processes", type=int, default=None, help="search worker processes (default: one per core)")
+    parser.add_argument("--max-searches", type=int, default=None,
+                        help="AI searches queued or running at once (default: twice the workers)")
+    parser.add_argument("--engine", default="{}",
+                        help="HalmaEngine settings applied to every AI, as JSON (e.g. opening_book, endgame_table)")
+    parser.add_argument("--time-limit", type=float, default=DEFAULT_TIME_LIMIT,
+                        help="seconds per AI move for clients that don't set time_limit")
+    parser.add_argument("--load-test", type=int, metavar="GAMES", help="play this many AI vs AI games and report throughput")
+    parser.add_argument("--concurrency", type=int, default=32, help="games in progress at once during --load-test")
+    parser.add_argument("--board-size", type=int, default=8)
+    parser.add_argument("--ai", default='{"ai_search_depth": 1}', help="HalmaEngine settings for --load-test, as JSON")
+    parser.add_argument("--max-moves", type=int, default=200, help="--load-test games reaching this many moves are drawn")
+    args = parser.parse_args(argv)
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
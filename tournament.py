@@ -0,0 +1,118 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from multiprocessing import Pool
+from engine import HalmaEngine
+from replay import GAME_RECORD_SUFFIX, write_game
+
+def play_game(game_id, board_size, red_config, green_config, seed, random_opening, max_moves, record_dir = None):
+    """Play one AI vs AI game and return its result record, saving its moves to record_dir if given"""
+    rng = random.Random(seed)
+    game = HalmaEngine(board_size)
+    players = {"red": HalmaEngine(board_size, **red_config), "green": HalmaEngine(board_size, **green_config)}
+    think_time = {"red": 0.0, "green": 0.0}
+    ai_moves = {"red": 0, "green": 0}
+    moves = 0
+    played = []
+
+    while game.winner() is None and moves < max_moves:
+        color = game.turn
+        if moves < random_opening:
+            move = rng.choice(game.legal_moves())
+        else:
+            start = time.perf_counter()
+            move = players[color].get_ai_move(game.board, color)
+            think_time[color] += time.perf_counter() - start
+            ai_moves[color] += 1
+        if move is None:
+            break
+        game.play_move(*move)
+        played.append(move)
+        moves += 1
+
+    for player in players.values():
+        player.close()
+    if record_dir:
+        with open(os.path.join(record_dir, f"game_{game_id:05d}{GAME_RECORD_SUFFIX}"), "w") as f:
+            write_game(f, board_size, played, game.winner(), game.red_score, game.green_score)
+    return {
+        "game": game_id,
+        "seed": seed,
+        "winner": game.winner(),
+        "moves": moves,
+        "red_score": game.red_score,
+        "green_score": game.green_score,
+        "red_seconds_per_move": think_time["red"] / ai_moves["red"] if ai_moves["red"] else 0.0,
+        "green_seconds_per_move": think_time["green"] / ai_moves["green"] if ai_moves["green"] else 0.0,
+    }
+
+def _play_game(args):
+    return play_game(*args)
+
+def completed_games(path):
+    """Game ids already recorded in a results file, so an interrupted run can pick up where it stopped"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["game"])
+            except (ValueError, KeyError):
+                # a line cut short when the run was killed
+                continue
+    return done
+
+def ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+def run_tournament(games, board_size, red_config, green_config, output, processes = None, seed = 0,
+                   random_opening = 4, max_moves = 1000, resume = False, record_dir = None):
+    done = completed_games(output) if resume else set()
+    if record_dir:
+        os.makedirs(record_dir, exist_ok=True)
+    jobs = [(game_id, board_size, red_config, green_config, seed + game_id, random_opening, max_moves, record_dir)
+            for game_id in range(games) if game_id not in done]
+    totals = {"red": 0, "green": 0, None: 0}
+
+    with open(output, "a" if resume else "w") as out, Pool(processes) as pool:
+        if out.tell() and not ends_with_newline(output):
+            out.write("\n")
+        for result in pool.imap_unordered(_play_game, jobs):
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            totals[result["winner"]] += 1
+
+    return totals
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Play AI vs AI Halma games in parallel and stream results as JSON Lines")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--board-size", type=int, default=8)
+    parser.add_argument("--red", default="{}", help="HalmaEngine keyword arguments for red, as JSON")
+    parser.add_argument("--green", default="{}", help="HalmaEngine keyword arguments for green, as JSON")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--output", default="tournament.jsonl")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--random-opening", type=int, default=4,
+                        help="plies played at random before the AIs take over, so games differ")
+    parser.add_argument("--max-moves", type=int, default=1000, help="games reaching this many moves are drawn")
+    parser.add_argument("--resume", action="store_true", help="skip games already in --output and append the rest")
+    parser.add_argument("--records", help="also save every game's moves to this directory, for replay.py")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    totals = run_tournament(args.games, args.board_size, json.loads(args.red), json.loads(args.green), args.output,
+                            args.processes, args.seed, args.random_opening, args.max_moves, args.resume, args.records)
+    played = sum(totals.values())
+    elapsed = time.perf_counter() - start
+    print(f"{played} games in {elapsed:.1f}s: red {totals['red']}, green {totals['green']}, drawn {totals[None]}",
+          file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
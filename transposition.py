@@ -0,0 +1,82 @@
+import random
+from geometry import iter_bits
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+ZOBRIST_SEED = 0x4A1A
+
+_zobrist_keys = {}
+
+class ZobristKeys:
+    """Random 64 bit keys for every (square, color) pair plus one for red to move"""
+    def __init__(self, board_size, seed = ZOBRIST_SEED):
+        rng = random.Random(seed + board_size)
+        num_cells = board_size * board_size
+        self.red = [rng.getrandbits(64) for _ in range(num_cells)]
+        self.green = [rng.getrandbits(64) for _ in range(num_cells)]
+        self.red_to_move = rng.getrandbits(64)
+
+    def hash_masks(self, red, green):
+        key = 0
+        for index in iter_bits(red):
+            key ^= self.red[index]
+        for index in iter_bits(green):
+            key ^= self.green[index]
+        return key
+
+def get_zobrist_keys(board_size):
+    keys = _zobrist_keys.get(board_size)
+    if keys is None:
+        keys = _zobrist_keys[board_size] = ZobristKeys(board_size)
+    return keys
+
+class TranspositionTable:
+    """
+    Fixed number of slots indexed by key % size, so memory never grows past the cap
+
+    Each slot holds (key, depth, value, flag, best_move, generation). A new
+    entry replaces the slot's occupant when the slot is empty, holds the same
+    position, was written by an earlier search, or was searched no deeper
+    """
+    def __init__(self, size):
+        self.size = size
+        self.slots = [None] * size
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def new_search(self):
+        self.generation += 1
+
+    def probe(self, key):
+        entry = self.slots[key % self.size]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, value, flag, best_move):
+        slot = key % self.size
+        entry = self.slots[slot]
+        if entry is not None and entry[0] != key:
+            if entry[5] == self.generation and entry[1] > depth:
+                return
+            self.replacements += 1
+        self.slots[slot] = (key, depth, value, flag, best_move, self.generation)
+        self.stores += 1
+
+    def clear(self):
+        self.slots = [None] * self.size
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def hit_rate(self):
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0.0